@@ -0,0 +1,26 @@
+"""Benchmarks for pyterranetes, run against synthetic trees of p10s
+scripts, values files, hcl and yaml.
+
+Run everything (from the repository root) with:
+
+.. code-block:: none
+
+    $ python -m benchmarks run
+
+or a subset, at the smallest sizes only, with:
+
+.. code-block:: none
+
+    $ python -m benchmarks run --quick -k merge_dicts -k from_files
+
+Each benchmark runs in a fresh process, so the peak RSS is its own,
+and the wall time of every repetition, along with the peak RSS, is
+written to ``benchmarks/results/<commit>.json`` (or ``--output``).
+Two results files, say from before and after a change, can be
+compared with:
+
+.. code-block:: none
+
+    $ python -m benchmarks compare before.json after.json
+
+"""
@@ -0,0 +1,174 @@
+import fnmatch
+import json
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import click
+
+from benchmarks.suite import BENCHMARKS
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def _peak_rss():
+    """This process's peak resident set size, in bytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # NOTE linux reports kilobytes, macos bytes.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _clear_caches():
+    """Empties the in process caches, those older commits have."""
+    try:
+        from p10s.parse_cache import CACHE
+    except ImportError:
+        pass
+    else:
+        CACHE.clear()
+    try:
+        from p10s.values import DIRECTORY_CACHE
+    except ImportError:
+        pass
+    else:
+        DIRECTORY_CACHE.clear()
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            cwd=str(Path(__file__).parent),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            universal_newlines=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _selected(patterns, quick):
+    for name, (function, sizes) in BENCHMARKS.items():
+        if patterns and not any(fnmatch.fnmatch(name, "*%s*" % p) for p in patterns):
+            continue
+        for size in sizes[:1] if quick else sizes:
+            yield name, size
+
+
+def _run_in_child(name, size, repeat, dir):
+    """Runs one benchmark in a fresh interpreter, so neither the peak
+    RSS nor any caches carry over from the previous one."""
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks", "one", name, str(size), str(repeat), dir],
+        cwd=str(Path(__file__).parent.parent),
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    if result.returncode != 0:
+        raise click.ClickException("Benchmark %s[%d] failed." % (name, size))
+    return json.loads(result.stdout)
+
+
+@click.group()
+def cli():
+    pass
+
+
+@cli.command()
+@click.option(
+    "-k",
+    "patterns",
+    multiple=True,
+    help="Only run the benchmarks whose name contains this, can be repeated.",
+)
+@click.option("--quick", is_flag=True, help="Only run the smallest size of each.")
+@click.option("-r", "--repeat", default=5, show_default=True, type=click.IntRange(1))
+@click.option("-o", "--output", type=click.Path(dir_okay=False))
+def run(patterns, quick, repeat, output):
+    """Runs the benchmarks and writes the results to OUTPUT (by default
+    benchmarks/results/<commit>.json)."""
+    commit = _commit()
+    results = {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "benchmarks": {},
+    }
+    with tempfile.TemporaryDirectory(prefix="p10s-bench-") as dir:
+        for name, size in _selected(patterns, quick):
+            key = "%s[%d]" % (name, size)
+            result = _run_in_child(name, size, repeat, dir)
+            results["benchmarks"][key] = result
+            click.echo(
+                "%-28s %10.4fs %8.1fMB"
+                % (key, min(result["wall"]), result["peak_rss"] / 2**20)
+            )
+    if output is None:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        output = RESULTS_DIR / ("%s.json" % commit)
+    with open(str(output), "w") as file:
+        json.dump(results, file, indent=2, sort_keys=True)
+    click.echo("Results written to %s" % output)
+
+
+@cli.command(hidden=True)
+@click.argument("name")
+@click.argument("size", type=int)
+@click.argument("repeat", type=int)
+@click.argument("dir")
+def one(name, size, repeat, dir):
+    function, sizes = BENCHMARKS[name]
+    wall = []
+    for _ in range(repeat):
+        _clear_caches()
+        thunk = function(dir, size)
+        start = time.perf_counter()
+        thunk()
+        wall.append(time.perf_counter() - start)
+    click.echo(json.dumps({"wall": wall, "peak_rss": _peak_rss()}))
+
+
+@cli.command()
+@click.argument("before", type=click.File())
+@click.argument("after", type=click.File())
+@click.option(
+    "--threshold",
+    default=0.1,
+    show_default=True,
+    help="Flag changes larger than this fraction.",
+)
+def compare(before, after, threshold):
+    """Compares the best wall time and the peak RSS of every benchmark in
+    both BEFORE and AFTER."""
+    before = json.load(before)["benchmarks"]
+    after = json.load(after)["benchmarks"]
+    click.echo(
+        "%-28s %10s %10s %8s %10s %10s %8s"
+        % ("benchmark", "before", "after", "", "rss before", "rss after", "")
+    )
+    regressions = 0
+    for key in sorted(set(before) & set(after)):
+        row = [key]
+        for a, b, unit in (
+            (min(before[key]["wall"]), min(after[key]["wall"]), 1),
+            (before[key]["peak_rss"], after[key]["peak_rss"], 2**20),
+        ):
+            change = (b - a) / a if a else 0.0
+            flag = ""
+            if change > threshold:
+                flag = "!"
+                regressions += 1
+            row.extend([a / unit, b / unit, "%+.0f%%%s" % (change * 100, flag)])
+        click.echo("%-28s %10.4f %10.4f %8s %10.1f %10.1f %8s" % tuple(row))
+    if regressions:
+        click.echo("%d regression(s) over %d%%." % (regressions, threshold * 100))
+
+
+if __name__ == "__main__":
+    cli(prog_name="python -m benchmarks")
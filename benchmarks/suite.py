@@ -0,0 +1,467 @@
+"""The benchmarks themselves.
+
+A benchmark is a function, registered with :py:func:`benchmark`, which
+is given a scratch directory and a size and does whatever setup it
+needs before returning the callable to time. It's called again before
+every repetition, so the callable is free to consume (or mutate) what
+it was given.
+
+The parse cache, and the values of directories Values.from_files
+keeps, are emptied before every repetition, benchmarks which want them
+warm have to parse whatever they need during setup.
+"""
+
+from pathlib import Path
+
+from benchmarks import trees
+
+BENCHMARKS = {}
+
+
+def benchmark(*sizes):
+    """Registers the decorated function as a benchmark, run once for
+    each of ``sizes``. The first size is the one ``--quick`` uses."""
+
+    def register(function):
+        BENCHMARKS[function.__name__] = (function, sizes)
+        return function
+
+    return register
+
+
+def _tree(dir, name, build):
+    """Builds, once per run, the tree ``name`` in ``dir``."""
+    root = Path(dir) / name
+    if not root.exists():
+        build(root)
+    return root
+
+
+@benchmark(10, 100, 1000)
+def generate(dir, size):
+    from p10s.generator import Generator
+
+    root = _tree(dir, "scripts-%d" % size, lambda root: trees.scripts_tree(root, size))
+    return lambda: Generator().generate(root)
+
+
+@benchmark(100, 1000)
+def generate_cached(dir, size):
+    """A second generate, with the build cache, where nothing changed."""
+    from p10s.generator import Generator
+
+    root = _tree(dir, "cached-%d" % size, lambda root: trees.scripts_tree(root, size))
+    Generator().generate(root, cache=True)
+    return lambda: Generator().generate(root, cache=True)
+
+
+@benchmark(100, 500)
+def merge_dicts(dir, size):
+    """Merges ``size`` overlapping, nested, dicts."""
+    from p10s.utils import merge_dicts
+
+    dicts = [trees.nested(4, 4, i) for i in range(size)]
+    return lambda: merge_dicts(*dicts)
+
+
+def _legacy_merge_dicts(*args):
+    """merge_dicts as it was before it became iterative, to compare
+    against."""
+    if len(args) == 0:
+        return {}
+    elif len(args) == 1:
+        return args[0]
+    args = list(args)
+    first = args.pop(0)
+    rest = _legacy_merge_dicts(*args)
+
+    def rec(a, b):
+        for k in b.keys():
+            new = b[k]
+            if isinstance(new, dict):
+                existing = a.get(k, a)
+                if existing is not a and isinstance(existing, dict):
+                    rec(existing, new)
+                    continue
+            a[k] = new
+
+    rec(first, rest)
+    return first
+
+
+def _merge(legacy):
+    if legacy:
+        return _legacy_merge_dicts
+    from p10s.utils import merge_dicts
+
+    return merge_dicts
+
+
+def _wide(size):
+    """Four dicts of ``size`` keys, each holding a small dict."""
+    return [
+        {"k%d" % key: {"n": n, "v%d" % n: key} for key in range(size)} for n in range(4)
+    ]
+
+
+def _deep(size):
+    """100 dicts ``size`` levels deep."""
+    return [trees.nested(1, size, {"n": n}) for n in range(100)]
+
+
+@benchmark(10000)
+def merge_wide(dir, size):
+    merge, dicts = _merge(False), _wide(size)
+    return lambda: merge(*dicts)
+
+
+@benchmark(10000)
+def merge_wide_legacy(dir, size):
+    merge, dicts = _merge(True), _wide(size)
+    return lambda: merge(*dicts)
+
+
+@benchmark(50)
+def merge_deep(dir, size):
+    merge, dicts = _merge(False), _deep(size)
+    return lambda: merge(*dicts)
+
+
+@benchmark(50)
+def merge_deep_legacy(dir, size):
+    merge, dicts = _merge(True), _deep(size)
+    return lambda: merge(*dicts)
+
+
+@benchmark(10, 50)
+def from_files(dir, size):
+    """Values from ``size`` levels of values.yaml files."""
+    from p10s.values import Values
+
+    root = _tree(dir, "values-%d" % size, lambda root: trees.values_tree(root, size))
+    leaf = root.joinpath(*("l%02d" % level for level in range(size)))
+    return lambda: Values.from_files(leaf)
+
+
+@benchmark(100, 1000)
+def from_files_shared(dir, size):
+    """Values from ``size`` sibling directories, each with its own
+    values.yaml, under 10 levels of shared ones."""
+    from p10s.values import Values
+
+    def build(root):
+        shared = trees.values_tree(root, 10)
+        for i in range(size):
+            (shared / ("s%d" % i)).mkdir()
+            (shared / ("s%d" % i) / "values.yaml").write_text("script: %d\n" % i)
+
+    root = _tree(dir, "shared-%d" % size, build)
+    shared = root.joinpath(*("l%02d" % level for level in range(10)))
+    leaves = [shared / ("s%d" % i) for i in range(size)]
+    return lambda: [Values.from_files(leaf) for leaf in leaves]
+
+
+@benchmark(1000, 10000)
+def values_scopes(dir, size):
+    """``size`` values() blocks, each reading a couple of values, over a
+    VALUES with 200 keys."""
+    from p10s.values import Values, use_values, value, values
+
+    use_values(Values({"k%d" % i: trees.nested(4, 3, i) for i in range(200)}))
+
+    def run():
+        for i in range(size):
+            with values({"k%d" % (i % 8): {"override": i}}, i=i):
+                value("i")
+                value("k0")
+
+    return run
+
+
+@benchmark(1000, 10000)
+def many_from_hcl(dir, size):
+    from p10s.terraform import many_from_hcl
+
+    source = trees.hcl_source(size)
+    return lambda: many_from_hcl(source)
+
+
+@benchmark(500, 5000)
+def many_from_yaml(dir, size):
+    from p10s.kubernetes import many_from_yaml
+
+    source = trees.yaml_source(size)
+    return lambda: many_from_yaml(source)
+
+
+@benchmark(1000, 10000)
+def many_from_hcl_warm(dir, size):
+    """many_from_hcl on text it has already parsed."""
+    from p10s.terraform import many_from_hcl
+
+    source = trees.hcl_source(size)
+    many_from_hcl(source)
+    return lambda: many_from_hcl(source)
+
+
+@benchmark(500, 5000)
+def many_from_yaml_warm(dir, size):
+    """many_from_yaml on text it has already parsed."""
+    from p10s.kubernetes import many_from_yaml
+
+    source = trees.yaml_source(size)
+    many_from_yaml(source)
+    return lambda: many_from_yaml(source)
+
+
+@benchmark(5000, 50000)
+def many_from_yaml_file(dir, size):
+    """Every object from a large file, all at once."""
+    from p10s.kubernetes import many_from_yaml
+
+    path = _yaml_file(dir, size)
+    return lambda: many_from_yaml(path)
+
+
+@benchmark(5000, 50000)
+def iter_from_yaml_file(dir, size):
+    """Every object from a large file, one at a time."""
+    from p10s.kubernetes import iter_from_yaml
+
+    path = _yaml_file(dir, size)
+    return lambda: sum(1 for _ in iter_from_yaml(path))
+
+
+def _yaml_file(dir, size):
+    path = Path(dir) / ("bundle-%d.yaml" % size)
+    if not path.exists():
+        path.write_text(trees.yaml_source(size))
+    return path
+
+
+@benchmark(1000, 10000)
+def tf_add(dir, size):
+    """Adding ``size`` resources, one at a time, to a tf.Context."""
+    from p10s import tf
+
+    blocks = [
+        tf.Resource("aws_instance", name, body)
+        for name, body in trees.resources(size).items()
+    ]
+
+    def run():
+        c = tf.Context(output=Path(dir) / "add.tf.json")
+        for block in blocks:
+            c += block
+
+    return run
+
+
+@benchmark(1000, 10000)
+def tf_add_list(dir, size):
+    """Adding ``size`` resources, all at once, to a strict tf.Context."""
+    from p10s import tf
+
+    blocks = [
+        tf.Resource("aws_instance", name, body)
+        for name, body in trees.resources(size).items()
+    ]
+
+    def run():
+        c = tf.Context(output=Path(dir) / "add.tf.json", strict=True)
+        c += blocks
+
+    return run
+
+
+def _modules(size):
+    from p10s import tf
+
+    c = tf.Context()
+    sources = ["./m%d" % i for i in range(size // 10)]
+    c += [
+        tf.Module("m%d" % i, {"source": sources[i % len(sources)]}) for i in range(size)
+    ]
+    return c, sources
+
+
+@benchmark(1000, 10000)
+def tf_find(dir, size):
+    """``size`` finds of the 10 modules with a given source, among
+    ``size`` modules."""
+    c, sources = _modules(size)
+    return lambda: [
+        c.find("module", where={"source": source}) for source in sources * 10
+    ]
+
+
+@benchmark(1000, 10000)
+def tf_find_scan(dir, size):
+    """tf_find, the way it had to be done before find()."""
+    c, sources = _modules(size)
+
+    def find(source):
+        return [
+            name
+            for name, body in c.data["module"].items()
+            if body.get("source") == source
+        ]
+
+    return lambda: [find(source) for source in sources * 10]
+
+
+@benchmark(1000, 10000)
+def tf_render(dir, size):
+    from p10s import tf
+
+    c = tf.Context(output=Path(dir) / "render.tf.json")
+    c += [
+        tf.Resource("aws_instance", name, body)
+        for name, body in trees.resources(size).items()
+    ]
+    return c.render
+
+
+@benchmark(1000, 10000)
+def tf_render_compact(dir, size):
+    """tf_render with P10S_JSON_COMPACT set."""
+    import os
+
+    os.environ["P10S_JSON_COMPACT"] = "1"
+    return tf_render(dir, size)
+
+
+@benchmark(1000, 10000)
+def tf_render_compact_stdlib(dir, size):
+    """tf_render_compact with the standard library's json backend."""
+    import os
+
+    os.environ["P10S_JSON_BACKEND"] = "json"
+    return tf_render_compact(dir, size)
+
+
+def _json_load(backend, size):
+    import json
+
+    from p10s import tf
+    from p10s.json_backends import make_backend
+
+    c = tf.Context()
+    c += [
+        tf.Resource("aws_instance", name, body)
+        for name, body in trees.resources(size).items()
+    ]
+    loads, source = make_backend(backend).loads, json.dumps(c.data, indent=4)
+    return lambda: loads(source)
+
+
+@benchmark(1000, 10000)
+def json_load_orjson(dir, size):
+    return _json_load("orjson", size)
+
+
+@benchmark(1000, 10000)
+def json_load_stdlib(dir, size):
+    return _json_load("json", size)
+
+
+@benchmark(500, 5000)
+def k8s_render(dir, size):
+    from p10s import k8s
+
+    c = k8s.Context(output=Path(dir) / "render.yaml")
+    c += [k8s.Deployment(data=data) for data in trees.k8s_objects(size)]
+    return c.render
+
+
+@benchmark(500, 5000)
+def k8s_data_shared(dir, size):
+    """Rendering ``size`` objects sharing a large pod template."""
+    from p10s import k8s
+
+    template = k8s.Data({"spec": {"containers": k8s_objects_containers()}})
+    objects = [
+        k8s.Deployment(data={**data, "spec": {"template": template}})
+        for data in trees.k8s_objects(size)
+    ]
+    return lambda: [o.render() for o in objects]
+
+
+def k8s_objects_containers():
+    return [
+        {
+            "name": "c%d" % i,
+            "env": [{"name": "E%d" % j, "value": "v"} for j in range(20)],
+        }
+        for i in range(10)
+    ]
+
+
+@benchmark(500, 5000)
+def k8s_render_json(dir, size):
+    """k8s_render, as a json List object."""
+    from p10s import k8s
+
+    c = k8s.Context(output=Path(dir) / "render.json")
+    c += [k8s.Deployment(data=data) for data in trees.k8s_objects(size)]
+    return c.render
+
+
+@benchmark(500, 5000)
+def k8s_render_split(dir, size):
+    """k8s_render, to a file per object, after one of them changed."""
+    from p10s import k8s
+
+    c = k8s.Context(output=Path(dir) / ("split-%d" % size), split=True)
+    c += [k8s.Deployment(data=data) for data in trees.k8s_objects(size)]
+    c.render()
+    c.data[0].data["spec"]["replicas"] += 1
+    return c.render
+
+
+@benchmark(500, 5000)
+def yaml_render(dir, size):
+    from p10s import cfg
+
+    c = cfg.YAMLContext(output=Path(dir) / "render.yaml")
+    c += {"objects": trees.k8s_objects(size)}
+    return c.render
+
+
+def _yaml_load(backend, size):
+    from p10s.yaml_backends import make_backend
+
+    load_all, source = make_backend(backend).load_all, trees.yaml_source(size)
+    return lambda: list(load_all(source))
+
+
+def _yaml_dump(backend, dir, size):
+    from p10s.yaml_backends import make_backend
+
+    dump_all, documents = make_backend(backend).dump_all, trees.k8s_objects(size)
+
+    def run():
+        with open(str(Path(dir) / "dump.yaml"), "w") as stream:
+            dump_all(documents, stream)
+
+    return run
+
+
+@benchmark(500, 5000)
+def yaml_load_ruamel(dir, size):
+    return _yaml_load("ruamel", size)
+
+
+@benchmark(500, 5000)
+def yaml_load_libyaml(dir, size):
+    return _yaml_load("libyaml", size)
+
+
+@benchmark(500, 5000)
+def yaml_dump_ruamel(dir, size):
+    return _yaml_dump("ruamel", dir, size)
+
+
+@benchmark(500, 5000)
+def yaml_dump_libyaml(dir, size):
+    return _yaml_dump("libyaml", dir, size)
@@ -0,0 +1,134 @@
+"""Builders for the synthetic inputs the benchmarks run against.
+
+Everything is deterministic, the same ``size`` always produces the
+same files, so results from different commits are comparable.
+"""
+
+from pathlib import Path
+
+TF_SCRIPT = """\
+from p10s import tf
+from p10s.values import value
+
+c = tf.Context()
+for i in range(5):
+    c += tf.Resource("aws_instance", "i%d" % i, {{
+        "ami": value("ami", "ami-123456"),
+        "instance_type": "t2.micro",
+        "tags": {{"Name": "{name}-%d" % i, "Index": i}},
+    }})
+"""
+
+K8S_SCRIPT = """\
+from p10s import k8s
+from p10s.values import value
+
+c = k8s.Context()
+for i in range(5):
+    c += k8s.Deployment({{
+        "apiVersion": "apps/v1",
+        "kind": "Deployment",
+        "metadata": {{"name": "{name}-%d" % i}},
+        "spec": {{
+            "replicas": 2,
+            "template": {{"spec": {{"containers": [{{"image": value("image", "nginx")}}]}}}},
+        }},
+    }})
+"""
+
+
+def scripts_tree(root, count, per_dir=10):
+    """Writes ``count`` p10s scripts, alternating between terraform and
+    kubernetes, ``per_dir`` to a directory, under ``root``. Returns
+    ``root``."""
+    root = Path(root)
+    for i in range(count):
+        dir = root / ("d%03d" % (i // per_dir))
+        dir.mkdir(parents=True, exist_ok=True)
+        name = "s%04d" % i
+        template = TF_SCRIPT if i % 2 == 0 else K8S_SCRIPT
+        (dir / (name + ".p10s")).write_text(template.format(name=name))
+    return root
+
+
+def nested(width, depth, leaf):
+    """A dict ``depth`` levels deep with ``width`` keys per level."""
+    if depth == 0:
+        return leaf
+    return {"k%d" % i: nested(width, depth - 1, leaf) for i in range(width)}
+
+
+def values_tree(root, depth, width=4):
+    """Writes a ``values.yaml`` in each of ``depth`` nested directories
+    under ``root`` and returns the innermost directory."""
+    here = Path(root)
+    for level in range(depth):
+        here = here / ("l%02d" % level)
+        here.mkdir(parents=True, exist_ok=True)
+        lines = ["level: %d" % level, "shared:"]
+        lines.extend("  k%d: %d" % (i, level) for i in range(width * 4))
+        lines.append("level%d:" % level)
+        lines.extend("  k%d: {a: %d, b: [1, 2, 3]}" % (i, i) for i in range(width * 4))
+        (here / "values.yaml").write_text("\n".join(lines) + "\n")
+    return here
+
+
+def hcl_source(count):
+    """hcl text with ``count`` resource blocks."""
+    return "".join("""
+resource "aws_instance" "r%d" {
+  ami           = "ami-123456"
+  instance_type = "t2.micro"
+  count         = %d
+
+  tags {
+    Name = "r%d"
+  }
+}
+""" % (i, i % 3, i) for i in range(count))
+
+
+def yaml_source(count):
+    """A yaml stream with ``count`` kubernetes documents."""
+    kinds = ("Deployment", "ConfigMap", "Service")
+    return "".join("""---
+apiVersion: v1
+kind: %s
+metadata:
+  name: o%d
+  labels: {app: o%d, tier: backend}
+spec:
+  replicas: 2
+  ports:
+  - port: 80
+    targetPort: 8080
+""" % (kinds[i % 3], i, i) for i in range(count))
+
+
+def resources(count):
+    """``count`` tf resource bodies, keyed by name."""
+    return {
+        "r%d"
+        % i: {
+            "ami": "ami-123456",
+            "instance_type": "t2.micro",
+            "tags": {"Name": "r%d" % i, "Index": i},
+        }
+        for i in range(count)
+    }
+
+
+def k8s_objects(count):
+    """``count`` kubernetes deployments, as plain data."""
+    return [
+        {
+            "apiVersion": "apps/v1",
+            "kind": "Deployment",
+            "metadata": {"name": "o%d" % i, "labels": {"app": "o%d" % i}},
+            "spec": {
+                "replicas": 2,
+                "template": {"spec": {"containers": [{"image": "nginx:%d" % i}]}},
+            },
+        }
+        for i in range(count)
+    ]
@@ -18,12 +18,38 @@ The following things are importable from this module:
 ``yaml``, ``json``, ``hcl``
     parsers for syntax of the given type
 
+These are only imported when first used, so a script that only does
+terraform never pays for loading the yaml parser (and the ``p10s``
+command doesn't pay for any of them).
+
 """
 
-import p10s.config_context as cfg
-import p10s.kubernetes as k8s
-import p10s.terraform as tf
-import p10s.values
+import importlib
+
 from p10s.__version__ import __version__
-from p10s.generator import register_context
-from p10s.loads import hcl, json, yaml
+
+# name -> (module, attribute in that module or None for the module itself)
+_EXPORTS = {
+    "cfg": ("p10s.config_context", None),
+    "k8s": ("p10s.kubernetes", None),
+    "tf": ("p10s.terraform", None),
+    "values": ("p10s.values", None),
+    "register_context": ("p10s.generator", "register_context"),
+    "hcl": ("p10s.loads", "hcl"),
+    "json": ("p10s.loads", "json"),
+    "yaml": ("p10s.loads", "yaml"),
+}
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    module_name, attribute = _EXPORTS[name]
+    module = importlib.import_module(module_name)
+    value = module if attribute is None else getattr(module, attribute)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals().keys()) + list(_EXPORTS.keys()))
@@ -1,8 +1,86 @@
+import os
+import stat
+import threading
 from pathlib import Path
 
 from p10s.values import value
 
 
+class OutputFile:
+    """Context manager for (re)writing ``path``.
+
+    The body writes to a temporary file next to ``path``, on exit the
+    temporary file atomically replaces ``path`` if, and only if, their
+    contents differ. Unchanged outputs keep their mtime, so terraform,
+    make, file watchers and the like don't see a change.
+
+    After the body has run ``changed`` tells whether ``path`` was
+    actually written.
+
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.changed = None
+        # NOTE the leading dot keeps the watcher (which ignores
+        # dotfiles by default) from reacting to the temporary file
+        self.tmp = self.path.with_name(
+            ".%s.%d.%d.tmp" % (self.path.name, os.getpid(), threading.get_ident())
+        )
+
+    def __enter__(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.stream = self.tmp.open("w")
+        return self.stream
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stream.close()
+        if exc_type is not None or _same_contents(self.tmp, self.path):
+            self.tmp.unlink()
+            self.changed = False
+        else:
+            if self.path.exists():
+                mode = stat.S_IMODE(os.stat(str(self.path)).st_mode)
+                os.chmod(str(self.tmp), mode)
+            os.replace(str(self.tmp), str(self.path))
+            self.changed = True
+        return False
+
+
+def write_output(path, text):
+    """Writes ``text`` to ``path``, as :py:class:`OutputFile` would, and
+    returns whether ``path`` changed.
+
+    For the many small outputs of a single context, comparing with what's
+    there before writing anything saves creating, and deleting, a
+    temporary file for each unchanged one."""
+    try:
+        with open(str(path)) as f:
+            if f.read() == text:
+                return False
+    except (FileNotFoundError, UnicodeDecodeError):
+        pass
+    output = OutputFile(path)
+    with output as stream:
+        stream.write(text)
+    return output.changed
+
+
+def _same_contents(a, b, chunk_size=1024 * 1024):
+    try:
+        if os.stat(str(a)).st_size != os.stat(str(b)).st_size:
+            return False
+    except FileNotFoundError:
+        return False
+    with open(str(a), "rb") as fa, open(str(b), "rb") as fb:
+        while True:
+            chunk = fa.read(chunk_size)
+            if chunk != fb.read(chunk_size):
+                return False
+            if not chunk:
+                return True
+
+
 class BaseContext:
     def __init__(self, input=None, output=None):
         if input is None:
@@ -23,15 +101,18 @@ class BaseContext:
             self.output = None
 
     def render(self):
-        with self._output_stream() as stream:
+        """Writes this context to ``self.output``, leaving the file
+        untouched if it already has the right contents.
+
+        Returns a list of ``(path, changed)`` pairs, one for each file
+        the context renders to."""
+        output = OutputFile(self.output)
+        with output as stream:
             self.render_to_stream(stream)
+        return [(self.output, output.changed)]
 
     def render_to_stream(self, stream):
         raise NotImplementedError()  # pragma: no cover
 
-    def _output_stream(self):
-        self.output.parent.mkdir(parents=True, exist_ok=True)
-        return self.output.open("w")
-
     def __repr__(self):
         return "<" + self.__module__ + "." + self.__class__.__name__ + ">"
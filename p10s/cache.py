@@ -0,0 +1,109 @@
+"""Build cache for incremental generation.
+
+For each script we store a hash of the script itself and of every file
+it depended on the last time it was compiled, along with the files it
+rendered. A script whose inputs all hash the same, and whose outputs
+are all still there, doesn't need to be compiled again.
+
+The cache lives in a ``.p10s-cache`` directory at the root passed to
+:py:meth:`Generator.generate <p10s.generator.Generator.generate>`.
+
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from p10s.__version__ import __version__
+from p10s.json_writer import compact_default
+from p10s.validation import validate_default
+
+CACHE_DIR = ".p10s-cache"
+
+
+def settings():
+    """The settings, other than the inputs, which change what the
+    scripts generate, or whether they can."""
+    # NOTE with validation turned on the outputs written without it
+    # have to be validated, so generated again.
+    return {"json_compact": compact_default(), "validate": validate_default()}
+
+
+class BuildCache:
+    def __init__(self, root):
+        self.root = Path(root)
+        self.path = self.root / CACHE_DIR / "manifest.json"
+        self.scripts = self._load()
+        self._hashes = {}
+
+    def _load(self):
+        try:
+            with self.path.open() as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        # NOTE a different version of p10s, or the same one with
+        # different settings, may well generate different output from
+        # the same inputs, so we can't trust anything it wrote.
+        if manifest.get("version") != __version__:
+            return {}
+        if manifest.get("settings") != settings():
+            return {}
+        return manifest.get("scripts", {})
+
+    def hash(self, path):
+        """Returns the hex digest of the contents of ``path``, or ``None``
+        if it doesn't exist. Memoized, files are assumed not to change
+        during a single generate."""
+        path = str(path)
+        if path not in self._hashes:
+            try:
+                with open(path, "rb") as f:
+                    self._hashes[path] = hashlib.sha256(f.read()).hexdigest()
+            except FileNotFoundError:
+                self._hashes[path] = None
+        return self._hashes[path]
+
+    def is_fresh(self, filename):
+        """Returns True if ``filename`` was generated, successfully, with
+        exactly the inputs that exist now."""
+        entry = self.scripts.get(str(filename))
+        if entry is None:
+            return False
+        for output in entry["outputs"]:
+            if not os.path.exists(output):
+                return False
+        for input, digest in entry["inputs"].items():
+            if self.hash(input) != digest:
+                return False
+        return True
+
+    def update(self, filename, dependencies, outputs):
+        inputs = [filename] + sorted(dependencies)
+        self.scripts[str(filename)] = {
+            "inputs": {str(input): self.hash(input) for input in inputs},
+            "outputs": sorted(str(output) for output in outputs),
+        }
+
+    def invalidate(self, filename):
+        self.scripts.pop(str(filename), None)
+
+    def save(self):
+        for filename in list(self.scripts.keys()):
+            if not os.path.exists(filename):
+                del self.scripts[filename]
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".%d.tmp" % os.getpid())
+        with tmp.open("w") as f:
+            json.dump(
+                {
+                    "version": __version__,
+                    "settings": settings(),
+                    "scripts": self.scripts,
+                },
+                f,
+                indent=1,
+                sort_keys=True,
+            )
+        os.replace(str(tmp), str(self.path))
@@ -13,14 +13,16 @@ encoded data.
     c.variable.name = 'default-value'
 
 """
+
 import configparser
-import json
 from collections.abc import Mapping, Sequence
 from copy import deepcopy
 
+from p10s import json_writer
 from p10s.base import BaseContext
-from p10s.loads import ruamel
+from p10s.json_backends import backend as json_backend
 from p10s.utils import merge_dicts
+from p10s.yaml_backends import backend as yaml_backend
 
 
 class ConfigContext(BaseContext):
@@ -68,16 +70,29 @@ class YAMLContext(ConfigContext):
     output_file_extension = ".yaml"
 
     def render_to_stream(self, stream):
-        ruamel.dump_all([self.data], stream)
+        yaml_backend().dump_all([self.data], stream)
 
 
 class JSONContext(ConfigContext):
-    """Context for json files."""
+    """Context for json files.
+
+    Written with keys sorted and indented by 4 spaces or, with
+    ``compact=True``, on a single line. ``compact`` defaults to the
+    ``P10S_JSON_COMPACT`` environment variable, see
+    :py:mod:`p10s.json_writer`, and the output is the same whichever
+    :py:mod:`json backend <p10s.json_backends>` writes it."""
 
     output_file_extension = ".json"
 
+    def __init__(self, *args, compact=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.compact = compact
+
     def render_to_stream(self, steam):
-        json.dump(self.data, steam, indent=4, sort_keys=True)
+        compact = self.compact
+        if compact is None:
+            compact = json_writer.compact_default()
+        json_backend().dump(self.data, steam, compact=compact)
 
 
 class UnknownDataTypeError(ValueError):
@@ -0,0 +1,224 @@
+"""A long running p10s process which generates scripts on request.
+
+Starting ``p10s`` means starting python and importing click, the yaml
+and hcl parsers and so on before any work is done. ``p10s daemon``
+pays that cost once and then waits, on a unix socket, for paths to
+generate; ``p10s generate --via-daemon`` sends it the paths instead of
+generating them itself.
+
+The protocol is a single line of json in each direction. The request:
+
+.. code-block:: python
+
+    {"version": "0.10.5", "paths": ["/abs/path", ...], "verbose": false,
+     "jobs": 1, "cache": false, "environ": {...}}
+
+and the response:
+
+.. code-block:: python
+
+    {"ok": true, "stdout": "...", "stderr": "...", "error": null}
+
+Scripts run with the client's environment, not the daemon's, so
+:py:meth:`Values.from_environ <p10s.values.Values.from_environ>` sees
+the same values it would without the daemon.
+
+"""
+
+import io
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import tempfile
+import traceback
+from contextlib import contextmanager, redirect_stderr, redirect_stdout
+
+from p10s.__version__ import __version__
+
+
+def default_socket_path():
+    """The socket in ``$P10S_DAEMON_SOCKET``, if set, otherwise a per
+    user socket in ``$XDG_RUNTIME_DIR`` (or the temp dir)."""
+    path = os.environ.get("P10S_DAEMON_SOCKET")
+    if path:
+        return path
+    dir = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(dir, "p10s-%d.sock" % os.getuid())
+
+
+class DaemonUnavailable(Exception):
+    """There's no (compatible) daemon listening on the socket."""
+
+
+class DaemonError(Exception):
+    """The daemon ran the request but generating failed."""
+
+
+def _send(sock, message):
+    sock.sendall(json.dumps(message).encode("utf-8") + b"\n")
+
+
+def _receive(file):
+    line = file.readline()
+    if not line:
+        raise DaemonUnavailable("Connection closed by the daemon.")
+    return json.loads(line.decode("utf-8"))
+
+
+def generate(paths, verbose=False, jobs=1, cache=False, socket_path=None):
+    """Asks the daemon on ``socket_path`` to generate ``paths``.
+
+    Whatever the scripts wrote to stdout and stderr is copied to ours.
+    Raises :py:class:`DaemonUnavailable` if no daemon is listening and
+    :py:class:`DaemonError` if generating failed."""
+    socket_path = socket_path or default_socket_path()
+    request = {
+        "version": __version__,
+        "paths": [os.path.abspath(str(path)) for path in paths],
+        "verbose": verbose,
+        "jobs": jobs,
+        "cache": cache,
+        "environ": dict(os.environ),
+    }
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except OSError as e:
+            raise DaemonUnavailable(
+                "No p10s daemon listening on %s: %s" % (socket_path, e)
+            )
+        _send(sock, request)
+        with sock.makefile("rb") as file:
+            response = _receive(file)
+    if response.get("version") != __version__:
+        raise DaemonUnavailable(
+            "The daemon on %s is running p10s %s, not %s."
+            % (socket_path, response.get("version"), __version__)
+        )
+    sys.stdout.write(response["stdout"])
+    sys.stderr.write(response["stderr"])
+    if not response["ok"]:
+        raise DaemonError(response["error"])
+
+
+@contextmanager
+def _environ(environ):
+    saved = dict(os.environ)
+    os.environ.clear()
+    os.environ.update(environ)
+    try:
+        yield
+    finally:
+        os.environ.clear()
+        os.environ.update(saved)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        request = _receive(self.rfile)
+        response = self.server.daemon.handle(request)
+        self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+
+class Daemon:
+    """Serves generate requests on ``socket_path``, one at a time
+    (generating changes the current directory, ``sys.path`` and other
+    process wide state)."""
+
+    def __init__(self, socket_path=None, verbose=False):
+        self.socket_path = socket_path or default_socket_path()
+        self.verbose = verbose
+        self.server = None
+        self.stopping = False
+
+    def handle(self, request):
+        response = {"version": __version__, "ok": False, "error": None}
+        if request.get("version") != __version__:
+            response["error"] = "Version mismatch, client is %s." % request.get(
+                "version"
+            )
+            return response
+
+        # NOTE imported here so the client side of this module stays cheap
+        from p10s.generator import GenerateError, Generator
+        from p10s.validation import ValidationError
+
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            try:
+                with _environ(request["environ"]):
+                    for path in request["paths"]:
+                        Generator().generate(
+                            path,
+                            verbose=request["verbose"],
+                            jobs=request["jobs"],
+                            cache=request["cache"],
+                        )
+                response["ok"] = True
+            except (GenerateError, ValidationError) as e:
+                response["error"] = str(e)
+            except KeyboardInterrupt:
+                raise
+            except BaseException:
+                # NOTE SystemExit included, a script calling sys.exit()
+                # fails its request, it doesn't stop the daemon. Unless
+                # it's the daemon's own signal handler asking.
+                if self.stopping:
+                    raise
+                response["error"] = traceback.format_exc()
+        response["stdout"] = stdout.getvalue()
+        response["stderr"] = stderr.getvalue()
+        if self.verbose:
+            print(
+                "Generated" if response["ok"] else "Failed to generate",
+                ", ".join(request["paths"]),
+                file=sys.stderr,
+            )
+        return response
+
+    def bind(self):
+        if os.path.exists(self.socket_path):
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                if sock.connect_ex(self.socket_path) == 0:
+                    raise Exception(
+                        "A p10s daemon is already listening on %s." % self.socket_path
+                    )
+            os.unlink(self.socket_path)
+        # NOTE created with the right mode to begin with, a chmod after
+        # bind() would leave a window for other users to connect.
+        umask = os.umask(0o177)
+        try:
+            self.server = socketserver.UnixStreamServer(
+                self.socket_path, _RequestHandler
+            )
+        finally:
+            os.umask(umask)
+        self.server.daemon = self
+
+    def serve(self):
+        """Binds the socket, if that hasn't been done yet, and serves
+        requests until :py:meth:`shutdown` is called."""
+        if self.server is None:
+            self.bind()
+        if self.verbose:
+            print("Listening on", self.socket_path, file=sys.stderr)
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def shutdown(self):
+        self.server.shutdown()
+
+    def install_signal_handlers(self):
+        def handler(sig, frame):
+            self.stopping = True
+            raise SystemExit(128 + sig)
+
+        signal.signal(signal.SIGTERM, handler)
+        signal.signal(signal.SIGINT, handler)
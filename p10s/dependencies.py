@@ -0,0 +1,44 @@
+"""Tracking of the files a p10s script reads while it is being compiled.
+
+A compiled ``P10SScript`` has a ``dependencies`` set containing:
+
+- the modules it imported from its ``pyterranetes`` directory,
+- the files parsed through :py:mod:`p10s.loads`, and
+- the ``values.yaml`` files :py:meth:`Values.from_files
+  <p10s.values.Values.from_files>` looked for, including the ones
+  that don't exist (creating them would change the script's values).
+
+``p10s deps`` prints the same information as json.
+
+The loaders, and the import hook installed while compiling, report
+every file they look at with :py:func:`record`, anything running
+inside a :py:func:`tracking` block collects those paths.
+
+"""
+
+from contextlib import contextmanager
+from pathlib import Path
+
+_TRACKERS = []
+
+
+@contextmanager
+def tracking():
+    """Context manager collecting, in the set it returns, every file
+    passed to :py:func:`record` while the body runs."""
+    paths = set()
+    _TRACKERS.append(paths)
+    try:
+        yield paths
+    finally:
+        _TRACKERS.remove(paths)
+
+
+def record(path):
+    """Notes that ``path`` was (or, if it doesn't exist, would have
+    been) read. Relative paths are resolved against the current
+    directory, which is the script's directory while compiling."""
+    if _TRACKERS:
+        path = Path(path).absolute()
+        for paths in _TRACKERS:
+            paths.add(path)
@@ -1,12 +1,21 @@
 import copy
+import importlib.machinery
+import io
 import os
 import runpy
 import sys
-from contextlib import contextmanager
+import traceback
+from contextlib import contextmanager, redirect_stderr
+from itertools import repeat
 from pathlib import Path
-from pprint import pformat
 
+import p10s.parse_cache
+import p10s.values
+from p10s import kubernetes
 from p10s.base import BaseContext
+from p10s.cache import CACHE_DIR, BuildCache
+from p10s.dependencies import record, tracking
+from p10s.validation import ValidationError
 from p10s.values import values
 
 
@@ -14,13 +23,61 @@ from p10s.values import values
 def _global_state(dir, extra_sys_paths):
     here = os.getcwd()
     sys_path = copy.copy(sys.path)
+    # NOTE the kubernetes classes a script, or its library, defines are
+    # forgotten along with it.
+    kinds = dict(kubernetes.KINDS)
+    recorder = _ImportRecorder(extra_sys_paths)
+    _forget_modules(list(sys.modules.keys()), extra_sys_paths)
     try:
         os.chdir(str(dir))
         sys.path = [str(path) for path in extra_sys_paths] + sys.path
+        sys.meta_path.insert(0, recorder)
         yield
     finally:
         os.chdir(here)
         sys.path = sys_path
+        sys.meta_path.remove(recorder)
+        _forget_modules(list(sys.modules.keys()), extra_sys_paths)
+        kubernetes.KINDS.clear()
+        kubernetes.KINDS.update(kinds)
+
+
+def _in_dirs(file, dirs):
+    return any(
+        file.startswith(str(Path(d).absolute()) + os.sep) for d in dirs if d is not None
+    )
+
+
+def _forget_modules(names, dirs):
+    """Drops the modules ``names`` which were loaded from ``dirs``
+    from ``sys.modules``.
+
+    This way every script gets a fresh copy of its library modules,
+    instead of whatever the previous script left behind (or an outdated
+    one if the file changed since), and every import goes through the
+    :py:class:`_ImportRecorder`."""
+    for name in names:
+        file = getattr(sys.modules.get(name), "__file__", None)
+        if file is not None and _in_dirs(os.path.abspath(file), dirs):
+            del sys.modules[name]
+
+
+class _ImportRecorder:
+    """Import hook recording, as dependencies of the script being
+    compiled, the files of the modules imported from ``dirs``."""
+
+    def __init__(self, dirs):
+        self.dirs = dirs
+
+    def find_spec(self, fullname, path, target=None):
+        spec = importlib.machinery.PathFinder.find_spec(fullname, path)
+        if spec is None or not spec.has_location:
+            return None
+        origin = os.path.abspath(spec.origin)
+        if not _in_dirs(origin, self.dirs):
+            return None
+        record(origin)
+        return spec
 
 
 CONTEXTS = []
@@ -39,6 +96,8 @@ class P10SScript:
         self.filename = filename
         self.base_dir = filename.parent
         self.contexts = []
+        self.dependencies = set()
+        self.outputs = {}
         self.pyterranetes_dir = self._find_pyterranetes_dir(filename.parent)
 
     def render(self, verbose=False):
@@ -47,10 +106,33 @@ class P10SScript:
                 dir=self.base_dir, extra_sys_paths=[self.pyterranetes_dir]
             ):
                 if verbose:
+                    from pprint import pformat
+
                     _stderr(
                         "  Rendering", pformat(c), "to", c.output, "in", self.base_dir
                     )
-                c.render()
+                rendered = c.render()
+            if rendered is None:
+                # a context with its own render method, assume it wrote its output
+                rendered = [(c.output, True)]
+            for path, changed in rendered:
+                # NOTE context outputs are relative to the script's directory
+                self.outputs[self.base_dir / path] = changed
+        return self
+
+    def validate(self, verbose=False):
+        """Validates, without rendering them, the contexts which can be,
+        see :py:meth:`k8s.Context.validate
+        <p10s.kubernetes.Context.validate>`."""
+        for c in self.contexts:
+            if not hasattr(c, "validate"):
+                continue
+            with _global_state(
+                dir=self.base_dir, extra_sys_paths=[self.pyterranetes_dir]
+            ):
+                if verbose:
+                    _stderr("  Validating", c.output, "in", self.base_dir)
+                c.validate()
         return self
 
     def compile(self, verbose=False):
@@ -59,13 +141,14 @@ class P10SScript:
         with values({"p10s": {"file": self.filename}}):
             with _global_state(
                 dir=self.base_dir, extra_sys_paths=[self.pyterranetes_dir]
-            ):
+            ), tracking() as dependencies:
                 CONTEXTS.clear()
                 globals = runpy.run_path(str(self.filename))
                 for value in globals.values():
                     if isinstance(value, BaseContext):
                         self.contexts.append(value)
                 self.contexts.extend(CONTEXTS)
+        self.dependencies = dependencies
         return self
 
     def _find_pyterranetes_dir(self, root):
@@ -85,6 +168,135 @@ class P10SScript:
             count += 1
 
 
+class GenerateError(Exception):
+    """Raised when one or more scripts failed during a parallel
+    generate. ``failures`` is a list of ``(filename, traceback)``
+    pairs, in the order the scripts were discovered."""
+
+    def __init__(self, failures):
+        self.failures = failures
+
+    def __str__(self):
+        lines = ["%d of the p10s scripts failed:" % len(self.failures)]
+        for filename, error in self.failures:
+            lines.append("")
+            lines.append("%s:" % filename)
+            lines.append(error.rstrip())
+        return "\n".join(lines)
+
+
+def _init_worker(vals, parse_cache_dir):
+    # NOTE forked workers inherit whatever CONTEXTS and VALUES the
+    # parent had, spawned ones start from scratch. reset both so every
+    # worker starts from the same state, regardless of the start
+    # method. 20201104:mb
+    CONTEXTS.clear()
+    p10s.values.use_values(vals)
+    p10s.parse_cache.CACHE.directory = parse_cache_dir
+
+
+def _generate_script(filename, verbose):
+    """Compiles and renders the script ``filename`` capturing anything
+    it writes to stderr. Runs inside a pool worker, so both the
+    arguments and the return value have to be picklable."""
+    log = io.StringIO()
+    error = None
+    script = P10SScript(filename=filename)
+    with redirect_stderr(log):
+        try:
+            script.compile(verbose=verbose).render(verbose=verbose)
+        except ValidationError as e:
+            error = str(e) + "\n"
+        except Exception:
+            error = traceback.format_exc()
+    return filename, log.getvalue(), error, script.dependencies, script.outputs
+
+
+def _validate_script(filename, verbose):
+    """Compiles and validates the script ``filename``, as
+    :py:func:`_generate_script` generates it."""
+    log = io.StringIO()
+    error = None
+    with redirect_stderr(log):
+        try:
+            P10SScript(filename=filename).compile(verbose=verbose).validate(
+                verbose=verbose
+            )
+        except ValidationError as e:
+            error = str(e) + "\n"
+        except Exception:
+            error = traceback.format_exc()
+    return filename, log.getvalue(), error
+
+
+def _run_scripts(fn, filenames, verbose, jobs):
+    """Calls ``fn``, :py:func:`_generate_script` or
+    :py:func:`_validate_script`, on every script in ``filenames``,
+    spread over a pool of ``jobs`` processes, and yields the results,
+    in order, after copying each script's log to stderr. Once they're
+    all done raises a :py:class:`GenerateError` listing the scripts
+    which failed, if any."""
+    if jobs > 1 and len(filenames) > 1:
+        # NOTE imported here, multiprocessing is a noticeable part of our
+        # startup time and most runs are only generating a single script.
+        from concurrent.futures import ProcessPoolExecutor
+
+        pool = ProcessPoolExecutor(
+            max_workers=min(jobs, len(filenames)),
+            initializer=_init_worker,
+            initargs=(p10s.values.VALUES, p10s.parse_cache.CACHE.directory),
+        )
+        results = pool.map(fn, filenames, repeat(verbose))
+    else:
+        pool = None
+        results = (fn(filename, verbose) for filename in filenames)
+    failures = []
+    try:
+        for result in results:
+            filename, log, error = result[:3]
+            sys.stderr.write(log)
+            if error is not None:
+                failures.append((filename, error))
+            yield result
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    if failures:
+        raise GenerateError(failures)
+
+
+class Summary:
+    """What a call to :py:meth:`Generator.generate
+    <p10s.generator.Generator.generate>` did: how many scripts it ran
+    or ``skipped`` (with the build cache) and how many files were
+    ``written`` or left ``unchanged``. ``dependencies`` maps each script
+    which ran to its dependencies."""
+
+    def __init__(self):
+        self.scripts = 0
+        self.skipped = 0
+        self.written = 0
+        self.unchanged = 0
+        self.dependencies = {}
+
+    def add(self, filename, outputs, dependencies):
+        self.scripts += 1
+        self.dependencies[filename] = dependencies
+        for changed in outputs.values():
+            if changed:
+                self.written += 1
+            else:
+                self.unchanged += 1
+
+    def __str__(self):
+        return "%d scripts generated, %d skipped: %d files written, %d unchanged." % (
+            self.scripts,
+            self.skipped,
+            self.written,
+            self.unchanged,
+        )
+
+
 class Generator:
     def _p10s_scripts(self, root):
         if not root.exists():
@@ -98,15 +310,109 @@ class Generator:
                     if path.suffix == ".p10s":
                         yield Path(os.path.join(dirname, file))
 
-    def generate(self, root, verbose=False):
+    def generate(self, root, verbose=False, jobs=1, cache=False):
+        """Compiles and renders every p10s script in ``root``.
+
+        With ``jobs`` greater than 1 the scripts are spread over a pool
+        of ``jobs`` processes. Log output is still printed in the order
+        the scripts were found and, instead of stopping at the first
+        error, every script is run and a single
+        :py:class:`GenerateError <p10s.generator.GenerateError>` lists
+        all the failures.
+
+        With ``cache`` scripts whose inputs haven't changed since the
+        last generate are skipped, see :py:mod:`p10s.cache`, and parsed
+        files are cached on disk, see :py:mod:`p10s.parse_cache`.
+
+        Returns a :py:class:`Summary <p10s.generator.Summary>`, which
+        is also printed when ``verbose``."""
         root = Path(root).resolve()
-        scripts = [
-            P10SScript(filename=filename) for filename in self._p10s_scripts(root)
-        ]
-        for script in scripts:
+        filenames = list(self._p10s_scripts(root))
+        summary = Summary()
+        build_cache = None
+        parse_cache_dir = p10s.parse_cache.CACHE.directory
+        if cache:
+            build_cache = BuildCache(root if root.is_dir() else root.parent)
+            stale = [
+                f for f in filenames if not self._is_fresh(build_cache, f, verbose)
+            ]
+            summary.skipped = len(filenames) - len(stale)
+            filenames = stale
+            p10s.parse_cache.CACHE.directory = build_cache.root / CACHE_DIR / "parse"
+        try:
+            if jobs > 1 and len(filenames) > 1:
+                self._generate_parallel(filenames, verbose, jobs, build_cache, summary)
+            else:
+                self._generate_serial(filenames, verbose, build_cache, summary)
+        finally:
+            p10s.parse_cache.CACHE.directory = parse_cache_dir
+            if build_cache is not None:
+                build_cache.save()
+        if verbose:
+            _stderr(summary)
+        return summary
+
+    def dependencies(self, root):
+        """Compiles, without rendering, every p10s script in ``root`` and
+        returns a dict mapping each script to the set of files it
+        depends on.
+
+        See :py:mod:`p10s.dependencies` for what counts as a
+        dependency."""
+        root = Path(root).resolve()
+        return {
+            filename: P10SScript(filename=filename).compile().dependencies
+            for filename in self._p10s_scripts(root)
+        }
+
+    def validate(self, root, verbose=False, jobs=1):
+        """Compiles, without rendering, every p10s script in ``root`` and
+        validates their kubernetes objects, see :py:mod:`p10s.validation`.
+
+        Like :py:meth:`generate` the scripts are spread over ``jobs``
+        processes, every script is validated and a single
+        :py:class:`GenerateError <p10s.generator.GenerateError>` lists
+        all the failures. Returns the number of scripts validated."""
+        root = Path(root).resolve()
+        filenames = list(self._p10s_scripts(root))
+        for _ in _run_scripts(_validate_script, filenames, verbose, jobs):
+            pass
+        return len(filenames)
+
+    def _is_fresh(self, build_cache, filename, verbose):
+        if build_cache.is_fresh(filename):
+            if verbose:
+                _stderr("Skipping", filename, "(up to date)")
+            return True
+        return False
+
+    def _generate_serial(self, filenames, verbose, build_cache, summary):
+        for filename in filenames:
+            script = P10SScript(filename=filename)
             try:
                 script.compile(verbose=verbose).render(verbose=verbose)
             except Exception as e:
+                if build_cache is not None:
+                    build_cache.invalidate(filename)
                 if verbose:
-                    _stderr("Error while generating %s", script.filename)
+                    _stderr("Error while generating", script.filename)
                 raise e
+            summary.add(filename, script.outputs, script.dependencies)
+            if build_cache is not None:
+                build_cache.update(filename, script.dependencies, script.outputs)
+
+    def _generate_parallel(self, filenames, verbose, jobs, build_cache, summary):
+        for filename, log, error, dependencies, outputs in _run_scripts(
+            _generate_script, filenames, verbose, jobs
+        ):
+            if error is not None:
+                if verbose:
+                    _stderr("Error while generating", filename)
+            else:
+                summary.add(filename, outputs, dependencies)
+            if build_cache is None:
+                continue
+            if error is None:
+                build_cache.update(filename, dependencies, outputs)
+            else:
+                build_cache.invalidate(filename)
@@ -0,0 +1,225 @@
+"""Parsing and emitting json, as fast as the installed libraries allow.
+
+The standard library's json module defines the output: keys sorted,
+indented by 4 spaces or compact (see :py:mod:`p10s.json_writer`),
+everything outside of ASCII escaped. When orjson is installed it does
+the parsing, and writes the compact output, instead, with its output
+adjusted to be the same, byte for byte, and its input checked to give
+the same data.
+
+orjson escapes less and writes some floats, and NaN, differently. The
+non ASCII characters are escaped afterwards, with a regular
+expression, and when a document has anything else orjson can't write
+as the json module would (floats it formats differently, NaN or
+infinities, which it writes as null, so any null at all, integers over
+64 bits, non str keys, and values json refuses but orjson converts
+itself: dates and times, dataclasses, UUIDs and enums) it's written by
+:py:func:`p10s.json_writer.dump`. The same goes for parsing: text with
+integers orjson would turn into floats, or NaN and the like which it
+refuses, is parsed by the json module.
+
+orjson can only indent by 2 spaces, re-indenting its output costs as
+much as :py:func:`p10s.json_writer.dump` takes to write it, so the
+indented output is always written by the latter. orjson also builds
+the whole document in memory before it's written out, which
+:py:func:`p10s.json_writer.dump` doesn't.
+
+The backend can be forced with the ``P10S_JSON_BACKEND`` environment
+variable (or ``p10s generate --json-backend``):
+
+``orjson``
+    orjson, the default when available.
+``json``
+    the standard library.
+
+"""
+
+import json
+import os
+import re
+from enum import Enum
+from itertools import chain
+from uuid import UUID
+
+from p10s import json_writer
+
+BACKEND_ENV = "P10S_JSON_BACKEND"
+
+# NOTE with every digit turned into a 0 by _DIGITS, where a float
+# (json's are all written with a . or an e) can be, and what it can be
+# made of. orjson parses integers which don't fit in 64 bits as floats,
+# any run of 19 digits has json parse the text.
+_DIGITS = bytes.maketrans(b"123456789", b"000000000")
+_FLOAT_MARKS = (b"0.0", b"0e")
+_NUMBER = re.compile(rb"[-+.e0]*")
+_LONG_NUMBER = b"0" * 19
+
+_NOT_ASCII = re.compile("[^\x00-\x7e]")
+
+_CONTAINERS = frozenset([dict, list, tuple])
+_PLAIN = frozenset([str, int, float, bool, type(None)]) | _CONTAINERS
+
+
+class StdlibBackend:
+    name = "json"
+
+    def loads(self, text):
+        return json.loads(text)
+
+    def dump(self, data, stream, compact=False):
+        json_writer.dump(data, stream, compact=compact)
+
+
+class OrjsonBackend:
+    name = "orjson"
+
+    def loads(self, text):
+        import orjson
+
+        data = text.encode("utf-8", "surrogatepass") if isinstance(text, str) else text
+        if _LONG_NUMBER in data.translate(_DIGITS):
+            return json.loads(text)
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # NOTE NaN, Infinity, lone surrogates, ... which json
+            # accepts, or else raises its own error for.
+            return json.loads(text)
+
+    def dump(self, data, stream, compact=False):
+        text = self._dumps(data) if compact else None
+        if text is None:
+            json_writer.dump(data, stream, compact=compact)
+        else:
+            stream.write(text)
+
+    def _dumps(self, data):
+        """orjson's compact version of ``data``, or None if it isn't what
+        the json module would write."""
+        import orjson
+
+        if type(data) not in _CONTAINERS or _converted(data):
+            return None
+        try:
+            # NOTE dates, times and dataclasses are passed to _refuse, as
+            # json would refuse them.
+            output = orjson.dumps(
+                data,
+                default=_refuse,
+                option=orjson.OPT_SORT_KEYS
+                | orjson.OPT_PASSTHROUGH_DATETIME
+                | orjson.OPT_PASSTHROUGH_DATACLASS,
+            )
+        except orjson.JSONEncodeError:
+            return None
+        # NOTE orjson writes NaN and infinities as null.
+        if b"null" in output or not _same_floats(output):
+            return None
+        if output.isascii() and b"\x7f" not in output:
+            return output.decode("ascii")
+        return _NOT_ASCII.sub(_escape, output.decode("utf-8"))
+
+    @staticmethod
+    def available():
+        try:
+            import orjson  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+
+def _refuse(value):
+    raise TypeError("Object of type %s is not JSON serializable" % type(value).__name__)
+
+
+def _converted(data):
+    """Whether ``data`` has UUIDs or enums in it, which orjson converts,
+    with no way to turn it off, and json refuses (or, for enums which
+    are also ints or strs, writes the same). Subclasses of dict, list
+    and tuple, which aren't looked into, count too."""
+    # NOTE a level of the tree at a time, looking at the types of all
+    # its values at once, which is a lot faster than a container at a
+    # time.
+    dicts, sequences = ([data], []) if type(data) is dict else ([], [data])
+    while dicts or sequences:
+        values = list(
+            chain(
+                chain.from_iterable(map(dict.values, dicts)),
+                chain.from_iterable(sequences),
+            )
+        )
+        types = set(map(type, values))
+        for t in types - _PLAIN:
+            if issubclass(t, (UUID, Enum, dict, list, tuple)):
+                return True
+        dicts = [v for v in values if type(v) is dict] if dict in types else []
+        sequences = (
+            [v for v in values if type(v) is list or type(v) is tuple]
+            if list in types or tuple in types
+            else []
+        )
+    return False
+
+
+def _same_floats(output):
+    """Whether every float in orjson's ``output`` is written as json
+    would, checking anything in a string which looks like one too."""
+    digits = output.translate(_DIGITS)
+    for mark in _FLOAT_MARKS:
+        found = digits.find(mark)
+        while found != -1:
+            start = found
+            while start and digits[start - 1] in b"-+.e0":
+                start -= 1
+            end = _NUMBER.match(digits, found).end()
+            found = digits.find(mark, end)
+            try:
+                value = float(output[start:end])
+            except ValueError:
+                # NOTE only a string can have something like 1.2.3 in it.
+                continue
+            if repr(value).encode() != output[start:end]:
+                return False
+    return True
+
+
+def _escape(match):
+    code = ord(match.group())
+    if code < 0x10000:
+        return "\\u%04x" % code
+    code -= 0x10000
+    return "\\u%04x\\u%04x" % (0xD800 | (code >> 10), 0xDC00 | (code & 0x3FF))
+
+
+BACKENDS = {
+    "orjson": OrjsonBackend,
+    "json": StdlibBackend,
+}
+
+_BACKENDS = {}
+
+
+def backend():
+    """The json backend to use, see the module documentation for how
+    it's chosen."""
+    # NOTE looked up on every call, unlike the yaml backend, as the
+    # daemon runs each request with the client's environment.
+    name = os.environ.get(BACKEND_ENV)
+    if name not in _BACKENDS:
+        _BACKENDS[name] = make_backend(name)
+    return _BACKENDS[name]
+
+
+def make_backend(name=None):
+    """Returns a new backend named ``name`` or, if ``name`` is None, the
+    fastest one available."""
+    if name:
+        if name not in BACKENDS:
+            raise ValueError(
+                "Unknown json backend %s, expected one of %s."
+                % (name, ", ".join(sorted(BACKENDS)))
+            )
+        return BACKENDS[name]()
+    if OrjsonBackend.available():
+        return OrjsonBackend()
+    return StdlibBackend()
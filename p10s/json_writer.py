@@ -0,0 +1,170 @@
+"""Writing json, faster and in pieces.
+
+:py:class:`JSONContext <p10s.config_context.JSONContext>`, and so
+``tf.Context``, render with :py:func:`dump`, whose output is exactly
+what ``json.dump(data, stream, indent=4, sort_keys=True)`` writes. The
+standard library only has a C encoder for unindented json, with an
+indent it falls back to a generator per nesting level and a write
+per token. :py:func:`dump` walks the data with plain recursion,
+encodes the scalars with the C encoder, and writes to the stream in
+chunks, which is about twice as fast and never holds more than a
+chunk of the output in memory.
+
+Outputs only read by machines can be written compact: no indentation
+and no spaces, which makes them less than half the size and, as
+everything below the top levels goes through the C encoder, faster
+still to write. Compact output is turned on per context with
+``compact=True`` or, for every context which doesn't say, with
+``P10S_JSON_COMPACT=1`` in the environment (which is what ``p10s
+generate --compact`` sets).
+
+"""
+
+import json
+import os
+from json.encoder import c_make_encoder, encode_basestring_ascii
+
+COMPACT_ENV = "P10S_JSON_COMPACT"
+
+INDENT = 4
+
+# NOTE the compact output of anything this deep is built by the C
+# encoder in one go, for a terraform file that's each block's body.
+COMPACT_DEPTH = 3
+
+# NOTE how many pieces of output to collect before writing them out.
+CHUNK_SIZE = 8192
+
+_CONTAINERS = (dict, list, tuple)
+
+
+def compact_default():
+    """Whether contexts which don't say otherwise write compact json,
+    see the module documentation."""
+    return os.environ.get(COMPACT_ENV, "") not in ("", "0")
+
+
+def dump(data, stream, compact=False):
+    """Writes ``data``, as json with sorted keys, to ``stream``.
+
+    Indented by 4 spaces, or with ``compact`` on a single line with no
+    spaces."""
+    _Writer(stream, compact).write(data)
+
+
+def _encoder(separators):
+    """Returns a function encoding a value as ``json.dumps(value,
+    sort_keys=True, separators=separators)`` would."""
+    if c_make_encoder is None:
+        return json.JSONEncoder(sort_keys=True, separators=separators).encode
+    # NOTE JSONEncoder.encode makes a new C encoder on every call, which
+    # costs more than encoding a scalar or a small dict.
+    encoder = c_make_encoder(
+        {},
+        json.JSONEncoder().default,
+        encode_basestring_ascii,
+        None,
+        separators[1],
+        separators[0],
+        True,
+        False,
+        True,
+    )
+    return lambda value: "".join(encoder(value, 0))
+
+
+class _Writer:
+    def __init__(self, stream, compact):
+        self.stream = stream
+        self.compact = compact
+        self.chunks = []
+        if compact:
+            separators = (",", ":")
+        else:
+            separators = (", ", ": ")
+        self.key_separator = separators[1]
+        # NOTE everything which isn't a str goes through the standard
+        # encoder, so floats, subclasses, non str keys and unsupported
+        # types are handled, or refused, exactly as json.dump would.
+        self.encode = _encoder(separators)
+        self.encode_key = _encoder((",", ":"))
+
+    def write(self, data):
+        self.value(data, 0, "\n")
+        self.flush()
+
+    def flush(self):
+        self.stream.write("".join(self.chunks))
+        self.chunks.clear()
+
+    def scalar(self, value):
+        if type(value) is str:
+            return encode_basestring_ascii(value)
+        return self.encode(value)
+
+    def key(self, key):
+        if type(key) is str:
+            return encode_basestring_ascii(key)
+        return self.encode_key({key: 0})[1:-3]
+
+    def value(self, value, depth, newline):
+        if not isinstance(value, _CONTAINERS):
+            self.chunks.append(self.scalar(value))
+            return
+        if not value:
+            self.chunks.append("{}" if isinstance(value, dict) else "[]")
+            return
+        compact = self.compact
+        if compact:
+            if depth >= COMPACT_DEPTH:
+                self.chunks.append(self.encode(value))
+                return
+            inner = separator = ","
+        else:
+            inner = newline + " " * INDENT
+            separator = "," + inner
+        # NOTE this is the inner loop of rendering every json file,
+        # hence the local variables and the inlined str cases.
+        chunks = self.chunks
+        append = chunks.append
+        encode = self.encode
+        nested = self.value
+        depth += 1
+        if isinstance(value, dict):
+            key_separator = self.key_separator
+            append("{" if compact else "{" + inner)
+            first = True
+            for key, item in sorted(value.items()):
+                if first:
+                    first = False
+                else:
+                    append(separator)
+                if type(key) is str:
+                    append(encode_basestring_ascii(key))
+                else:
+                    append(self.key(key))
+                append(key_separator)
+                if type(item) is str:
+                    append(encode_basestring_ascii(item))
+                elif isinstance(item, _CONTAINERS):
+                    nested(item, depth, inner)
+                else:
+                    append(encode(item))
+            append("}" if compact else newline + "}")
+        else:
+            append("[" if compact else "[" + inner)
+            first = True
+            for item in value:
+                if first:
+                    first = False
+                else:
+                    append(separator)
+                if type(item) is str:
+                    append(encode_basestring_ascii(item))
+                elif isinstance(item, _CONTAINERS):
+                    nested(item, depth, inner)
+                else:
+                    append(encode(item))
+            append("]" if compact else newline + "]")
+        if len(chunks) >= CHUNK_SIZE:
+            self.flush()
@@ -47,36 +47,129 @@ convenience, creating a base KubernetesObject and passing in ``kind``
 is the fully equivalent. This is also the way to create ojects for
 kinds that are not pre-defined.
 
+:py:func:`from_yaml` and friends pick the class of each object from
+its ``apiVersion`` and ``kind``, by way of :py:data:`KINDS`, falling
+back to a plain KubernetesObject for kinds they don't know. Every
+subclass setting ``KIND`` (and, optionally, ``API_VERSION``) is added
+to :py:data:`KINDS` when it's defined, which is all it takes for the
+objects of a custom resource to be parsed as instances of their own
+class:
+
+.. code-block:: python
+
+    class Certificate(k8s.KubernetesObject):
+        API_VERSION = "cert-manager.io/v1"
+        KIND = "Certificate"
+
+        @property
+        def dns_names(self):
+            return self.spec["dnsNames"]
+
+    for o in k8s.many_from_yaml(Path("certificates.yaml")):
+        if isinstance(o, Certificate):
+            ...
+
+Classes defined in a script, or in its ``pyterranetes`` directory, are
+forgotten once the script has run, so they don't leak into the next
+script ``p10s generate`` (or the daemon, or the watcher) runs.
+
 p10s takes advantage of the fact that you can have multiple kubernetes
 objects in the same yaml file (represented as multiple kubernetes
 documents). Multiple ``KubernetesObject`` objects can be added to the
 same ``k8s.Context``, in the same p10s script, and kubernetes and helm
 will be able to properly parse it.
 
+A context created with ``split=True`` writes each object to a file of
+its own instead, in a directory (by default named after the script,
+``app.p10s`` renders to ``app/``), along with a ``kustomization.yaml``
+listing them all:
+
+.. code-block:: python
+
+    c = k8s.Context(split=True)
+    c += k8s.many_from_yaml(Path("operator.yaml"))
+
+The files are named after the objects' namespace, kind and name
+(``monitoring_deployment_prometheus.yaml``, ``clusterrole_view.yaml``)
+and, like every output, only rewritten when their contents change. So
+when one object changes only its file changes, and ``kubectl apply
+-k`` or a GitOps diff only sees that one. The files of objects which
+are no longer in the context, as listed by the previous
+``kustomization.yaml``, are deleted.
+
+kubernetes reads json manifests as well, which are a lot faster to
+write than yaml. ``format="json"`` writes the objects as a single
+``List`` object, ``format="jsonl"`` one object per line (or, with
+``split``, each object to a json file of its own). The format
+defaults to the output's extension, ``.json``, ``.jsonl`` or, for
+anything else, yaml:
+
+.. code-block:: python
+
+    c = k8s.Context(output="manifests.json")
+
+Keys are sorted and the objects kept in order, as with yaml, and the
+``List`` is indented unless compact json is on, see
+:py:mod:`p10s.json_writer`.
+
 """
 
+import io
+import re
 from copy import deepcopy
+from itertools import islice
 
-from p10s.base import BaseContext
+from p10s import validation
+from p10s.base import BaseContext, write_output
 from p10s.config_context import AutoData
-from p10s.loads import ruamel, yaml, yaml_all
+from p10s.json_backends import backend as json_backend
+from p10s.json_writer import compact_default
+from p10s.loads import yaml, yaml_all, yaml_iter
 from p10s.utils import merge_dicts
+from p10s.yaml_backends import backend as yaml_backend
+
+KUSTOMIZATION = "kustomization.yaml"
+
+# NOTE the output extension for each format.
+FORMATS = {"yaml": ".yaml", "json": ".json", "jsonl": ".jsonl"}
+
+# NOTE kubernetes names can only have lowercase letters, digits, - and
+# . in them (and : for some cluster wide objects), _ never appears in
+# a file name made from them.
+_UNSAFE = re.compile(r"[^a-z0-9.-]+")
 
 
 class Context(BaseContext):
     """Context class for generating kubernetes and helm files.
 
-    Really is just a YAML context."""
+    Really is just a YAML, or JSON, context. With ``split`` each object
+    is written to its own file, in the ``output`` directory, see the
+    module documentation."""
 
     output_file_extension = ".yaml"
 
-    def __init__(self, *args, data=None, **kwargs):
+    def __init__(self, *args, data=None, split=False, format=None, **kwargs):
         if data is None:
             self.data = []
         else:
             self.data = data
+        if format is not None and format not in FORMATS:
+            raise ValueError(
+                "Unknown format %s, expected one of %s."
+                % (format, ", ".join(sorted(FORMATS)))
+            )
+        self.split = split
+        if split:
+            # NOTE the default output, a directory named after the script
+            self.output_file_extension = ""
+        elif format is not None:
+            self.output_file_extension = FORMATS[format]
 
         super().__init__(*args, **kwargs)
+        if format is None:
+            suffix = self.output.suffix if self.output is not None else None
+            format = {ext: name for name, ext in FORMATS.items()}.get(suffix, "yaml")
+        self.format = format
 
     def add(self, object):
         if not isinstance(object, (list, tuple)):
@@ -96,7 +189,13 @@ class Context(BaseContext):
         return self.add(object)
 
     def __add__(self, block):
-        new = Context(input=self.input, output=self.output, data=deepcopy(self.data))
+        new = Context(
+            input=self.input,
+            output=self.output,
+            data=deepcopy(self.data),
+            split=self.split,
+            format=self.format,
+        )
         return new.add(block)
 
     def _render_data(self):
@@ -115,43 +214,272 @@ class Context(BaseContext):
                 )
         return documents
 
+    def render_to_stream(self, stream):
+        documents = self._render_data()
+        if self.format == "yaml":
+            # NOTE what the objects rendered to shares whatever they have
+            # in common, written out in full as when each had a copy.
+            yaml_backend().dump_all(documents, stream, aliases=False)
+        elif self.format == "json":
+            json_backend().dump(
+                {"apiVersion": "v1", "kind": "List", "items": documents},
+                stream,
+                compact=compact_default(),
+            )
+        else:
+            backend = json_backend()
+            for document in documents:
+                backend.dump(document, stream, compact=True)
+                stream.write("\n")
+
+    def _render_document(self, backend, document):
+        """``document`` as the contents of a file of its own."""
+        stream = io.StringIO()
+        if self.format == "yaml":
+            backend.dump_all([document], stream, aliases=False)
+        else:
+            backend.dump(document, stream, compact=compact_default())
+        return stream.getvalue()
+
+    def validate(self, schemas=None):
+        """Checks every object against the json schema for its apiVersion
+        and kind, by default from the directory in ``P10S_K8S_SCHEMAS``,
+        see :py:mod:`p10s.validation`, and raises a
+        :py:class:`ValidationError <p10s.validation.ValidationError>`
+        listing everything wrong with them."""
+        if schemas is None:
+            schemas = validation.schemas()
+        errors = []
+        for index, document in enumerate(self._render_data()):
+            for path, message in schemas.errors(document):
+                errors.append((self._describe(document, index), path, message))
+        if errors:
+            raise validation.ValidationError(errors)
+
+    def _describe(self, document, index):
+        """What to call ``document`` in validation errors."""
+        description = "%s #%d" % (self.output, index)
+        if isinstance(document, dict) and isinstance(document.get("metadata"), dict):
+            metadata = document["metadata"]
+            name = metadata.get("name")
+            if "namespace" in metadata:
+                name = "%s/%s" % (metadata["namespace"], name)
+            description += " %s %s" % (document.get("kind"), name)
+        return description
+
     def render(self):
-        with self._output_stream() as out:
-            ruamel.dump_all(self._render_data(), out)
+        if validation.validate_default():
+            self.validate()
+        if not self.split:
+            return super().render()
+        backend = yaml_backend() if self.format == "yaml" else json_backend()
+        suffix = ".yaml" if self.format == "yaml" else ".json"
+        rendered = []
+        names = []
+        taken = set()
+        for index, document in enumerate(self._render_data()):
+            name = _file_name(document, index)
+            while name in taken:
+                # NOTE the same object twice, or names which only differ
+                # by characters which can't be in a file name.
+                name = "%s_%d" % (name, index)
+            taken.add(name)
+            names.append(name + suffix)
+            path = self.output / names[-1]
+            text = self._render_document(backend, document)
+            rendered.append((path, write_output(path, text)))
+        stale = set(self._previous_names()) - set(names)
+        stream = io.StringIO()
+        yaml_backend().dump_all(
+            [
+                {
+                    "apiVersion": "kustomize.config.k8s.io/v1beta1",
+                    "kind": "Kustomization",
+                    "resources": names,
+                }
+            ],
+            stream,
+        )
+        path = self.output / KUSTOMIZATION
+        rendered.append((path, write_output(path, stream.getvalue())))
+        for name in stale:
+            try:
+                (self.output / name).unlink()
+            except FileNotFoundError:
+                pass
+        return rendered
+
+    def _previous_names(self):
+        """The files listed by the kustomization.yaml a previous render
+        wrote, if any."""
+        try:
+            text = (self.output / KUSTOMIZATION).read_text()
+        except FileNotFoundError:
+            return []
+        # NOTE not p10s.loads.yaml, the output isn't one of the script's
+        # dependencies.
+        previous = yaml_backend().load(text)
+        if not isinstance(previous, dict) or previous.get("kind") != "Kustomization":
+            return []
+        # NOTE only ever deleting what this context could have written.
+        return [
+            name
+            for name in previous.get("resources") or []
+            if isinstance(name, str) and "_" in name and "/" not in name
+        ]
+
+
+def _file_name(document, index):
+    """``namespace_kind_name``, the name of the file (less its extension)
+    ``document`` is written to by a split context, the namespace left
+    out if it has none and the name replaced by ``index`` if it has
+    none."""
+    kind = metadata = None
+    if isinstance(document, dict):
+        kind = document.get("kind")
+        metadata = document.get("metadata")
+    if not isinstance(metadata, dict):
+        metadata = {}
+    parts = [
+        metadata.get("namespace"),
+        kind or "object",
+        metadata.get("name") or str(index),
+    ]
+    return "_".join(_UNSAFE.sub("-", str(part).lower()) for part in parts if part)
 
 
 class Data:
+    """Some data, objects or parts of objects, to render into a context.
+
+    Data can be nested, a Data in another one's data is rendered in its
+    place. Rendering is memoized: a Data shared by many others (a
+    common pod template, say) is only rendered once, and anything in
+    the data which has no Data in it is used as is instead of being
+    copied. What :py:meth:`render` returns is shared, it mustn't be
+    changed.
+
+    Changes to the data, through ``data``, ``body`` or any other
+    reference to it, are picked up by the next render, with one
+    exception: adding a Data to a part of the data which had none in
+    it when it was last rendered. Call :py:meth:`changed` after doing
+    that."""
+
     def __init__(self, data=None):
         if data is None:
             self.data = {}
         else:
             self.data = data
 
-    def render(self):
-        def _rec(object):
-            if isinstance(object, (list, tuple)):
-                return [_rec(o) for o in object]
-            elif isinstance(object, dict):
-                return {_rec(k): _rec(v) for k, v in object.items()}
-            elif isinstance(object, Data):
-                return object.render()
-            else:
-                return object
+    @property
+    def data(self):
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._rendered = None
+        self._data = value
 
-        return _rec(self.data)
+    def changed(self):
+        """Tells this Data that its data was changed, see the class
+        documentation."""
+        self._rendered = None
+
+    def render(self):
+        rendered = self._rendered
+        # NOTE still good as long as none of the containers which had to
+        # be copied changed since, and every Data in it renders to what
+        # it did then, which, recursively, means none of them changed.
+        # The containers which weren't copied are part of what was
+        # rendered, changes to them are seen anyway.
+        if (
+            rendered is not None
+            and all(_unchanged(*copied) for copied in rendered[2])
+            and all(data.render() is value for data, value in rendered[1])
+        ):
+            return rendered[0]
+        nested, copied = [], []
+        value = _render(self._data, nested, copied)
+        self._rendered = (value, nested, copied)
+        return value
 
     @property
     def body(self):
-        return self.data
+        return self._data
 
     def update(self, new_body_values):
         """Merges in ``new_body_values`` with this block's body."""
-        self.data = merge_dicts(self.data, new_body_values)
+        self.data = merge_dicts(self._data, new_body_values)
         return self
 
 
+# NOTE what _render returns as is, without a call.
+_SCALARS = frozenset([str, int, float, bool, type(None)])
+
+_MISSING = object()
+
+
+def _render(value, nested, copied):
+    """``value`` with every Data in it rendered, and appended, with what
+    it rendered to, to ``nested``. Only what has a Data in it, or isn't
+    a plain dict or list (tuples, for example, which yaml can't write),
+    is copied, the containers which were are appended to ``copied``
+    with their items at the time."""
+    cls = type(value)
+    if isinstance(value, dict):
+        copy = None if cls is dict else {}
+        for index, (key, item) in enumerate(value.items()):
+            new_key = key if type(key) in _SCALARS else _render(key, nested, copied)
+            new_item = item if type(item) in _SCALARS else _render(item, nested, copied)
+            if copy is None:
+                if new_key is key and new_item is item:
+                    continue
+                copy = dict(islice(value.items(), index))
+            copy[new_key] = new_item
+        if copy is None:
+            return value
+        copied.append((value, list(value.items())))
+        return copy
+    if isinstance(value, (list, tuple)):
+        copy = None if cls is list else []
+        for index, item in enumerate(value):
+            new_item = item if type(item) in _SCALARS else _render(item, nested, copied)
+            if copy is None:
+                if new_item is item:
+                    continue
+                copy = value[:index]
+            copy.append(new_item)
+        if copy is None:
+            return value
+        if cls is not tuple:
+            copied.append((value, list(value)))
+        return copy
+    if isinstance(value, Data):
+        rendered = value.render()
+        nested.append((value, rendered))
+        return rendered
+    return value
+
+
+def _unchanged(container, items):
+    """Whether ``container`` still has the same ``items``, as
+    :py:func:`_render` recorded them, in it."""
+    if len(container) != len(items):
+        return False
+    if isinstance(container, dict):
+        return all(container.get(key, _MISSING) is item for key, item in items)
+    return all(a is b for a, b in zip(container, items))
+
+
+KINDS = {}
+"""The KubernetesObject subclass for each ``(apiVersion, kind)`` pair,
+an apiVersion of None matching objects of that kind with any
+apiVersion. Filled in as the subclasses are defined, see the module
+documentation."""
+
+
 class KubernetesObject(Data):
     KIND = None
+    API_VERSION = None
 
     def __init__(self, data=None, kind=None):
         super().__init__(data=data)
@@ -160,42 +488,56 @@ class KubernetesObject(Data):
             self.kind = kind
         elif self.KIND is not None:
             self.kind = self.KIND
+        if self.API_VERSION is not None and "apiVersion" not in self._data:
+            self.apiVersion = self.API_VERSION
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # NOTE only classes defining their own KIND, subclasses of
+        # Deployment and the like which add helpers, say, mustn't take
+        # its place.
+        if "KIND" in vars(cls) and cls.KIND is not None:
+            KINDS[(cls.API_VERSION, cls.KIND)] = cls
 
     @property
     def kind(self):
         """Property mapping this object's ``kind`` value"""
-        return self.data.get("kind", None)
+        return self._data.get("kind", None)
 
     @kind.setter
     def kind(self, value):
-        self.data["kind"] = value
+        self._data["kind"] = value
+        self.changed()
 
     @property
     def apiVersion(self):
         """Property mapping this object's ``apiVersion`` value"""
-        return self.data.get("apiVersion", None)
+        return self._data.get("apiVersion", None)
 
     @apiVersion.setter
     def apiVersion(self, value):
-        self.data["apiVersion"] = value
+        self._data["apiVersion"] = value
+        self.changed()
 
     @property
     def metadata(self):
         """Property mapping this object's ``metadata`` value"""
-        return self.data.get("metadata", None)
+        return self._data.get("metadata", None)
 
     @metadata.setter
     def metadata(self, value):
-        self.data["metadata"] = value
+        self._data["metadata"] = value
+        self.changed()
 
     @property
     def spec(self):
         """Property mapping this object's ``spec`` value"""
-        return self.data.get("spec", None)
+        return self._data.get("spec", None)
 
     @spec.setter
     def spec(self, value):
-        self.data["spec"] = value
+        self._data["spec"] = value
+        self.changed()
 
 
 class Deployment(KubernetesObject):
@@ -223,22 +565,23 @@ class Ingress(KubernetesObject):
 
 
 class Secret(KubernetesObject):
-    KIND = "Ingress"
+    KIND = "Secret"
+
+
+def object_class(api_version, kind):
+    """Returns the class :py:func:`from_yaml` and friends use for objects
+    with this ``apiVersion`` and ``kind``, see :py:data:`KINDS`."""
+    cls = KINDS.get((api_version, kind))
+    if cls is None:
+        cls = KINDS.get((None, kind), KubernetesObject)
+    return cls
 
 
 def _data_to_object(data):
     kind = data.get("kind", None)
-    if kind is not None:
-        cls = None
-        if kind == "Deployment":
-            cls = Deployment
-        if kind == "ConfigMap":
-            cls = ConfigMap
-        if kind == "Service":
-            cls = Service
-        return cls(data=data)
-    else:
-        raise Exception("Missing kind property on %s", data)
+    if kind is None:
+        raise Exception("Missing kind property on %s" % (data,))
+    return object_class(data.get("apiVersion"), kind)(data=data)
 
 
 def from_yaml(yaml_input):
@@ -248,4 +591,23 @@ def from_yaml(yaml_input):
 
 def many_from_yaml(yaml_input):
     """Parse the documents from ``yaml_input`` and returns a list of ``KubernetesObject``."""
-    return [_data_to_object(data) for data in yaml_all(yaml_input)]
+    return [_data_to_object(data) for data in yaml_all(yaml_input) if data is not None]
+
+
+def iter_from_yaml(yaml_input):
+    """Like :py:func:`many_from_yaml` but yields the ``KubernetesObject``
+    objects one at a time, parsing ``yaml_input`` as it goes. Peak memory
+    doesn't grow with the size of the input, which makes a difference
+    with multi megabyte bundles of CRDs and the like (the flip side is
+    that, unlike :py:func:`many_from_yaml`, nothing is cached):
+
+    .. code-block:: python
+
+        for o in k8s.iter_from_yaml(Path("operator.yaml")):
+            if o.kind == "Deployment":
+                c += o
+
+    Empty documents are skipped."""
+    for data in yaml_iter(yaml_input):
+        if data is not None:
+            yield _data_to_object(data)
@@ -12,30 +12,72 @@ want to be using one of the specific object generators instead:
 
 .. autofunction:: p10s.loads.yaml
 .. autofunction:: p10s.loads.yaml_all
+.. autofunction:: p10s.loads.yaml_iter
 .. autofunction:: p10s.loads.hcl
 .. autofunction:: p10s.loads.json
 
+The results of parsing are cached, see :py:mod:`p10s.parse_cache`,
+everything but :py:func:`yaml_iter` returns a new copy every time.
+
 """
+
 import io
-import json as json_lib
+from contextlib import contextmanager
 from pathlib import Path
 
-import hcl as pyhcl
-from ruamel.yaml import YAML
+from p10s.dependencies import record
+from p10s.json_backends import backend as json_backend
+from p10s.parse_cache import cached
+from p10s.yaml_backends import backend as yaml_backend
+
+# NOTE the yaml and hcl libraries take a while to import, and plenty of
+# scripts only ever need one of them, so they're only imported when
+# first needed (see p10s.yaml_backends for yaml).
+_RUAMEL = None
+
+
+def __getattr__(name):
+    # ``ruamel`` used to be a plain module level YAML instance
+    if name == "ruamel":
+        global _RUAMEL
+        if _RUAMEL is None:
+            from ruamel.yaml import YAML
 
-ruamel = YAML(typ="safe", pure=True)
-ruamel.default_flow_style = False
+            _RUAMEL = YAML(typ="safe", pure=True)
+            _RUAMEL.default_flow_style = False
+        return _RUAMEL
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
 
 
 def _data(object):
     if isinstance(object, (io.BufferedIOBase, io.TextIOBase, io.RawIOBase, io.IOBase)):
+        if isinstance(getattr(object, "name", None), str):
+            record(object.name)
         return object.read()
     elif isinstance(object, Path):
+        record(object)
         return object.open().read()
     else:
         return object
 
 
+@contextmanager
+def _stream(input):
+    """Like :py:func:`_data` but, instead of reading it, returns
+    ``input`` as something the yaml backends can read from as they
+    go."""
+    if isinstance(input, Path):
+        record(input)
+        with input.open() as stream:
+            yield stream
+    else:
+        if isinstance(input, io.IOBase) and isinstance(
+            getattr(input, "name", None), str
+        ):
+            record(input.name)
+        yield input
+
+
 def yaml(input):
     """Parses ``input`` as a single yaml document and returns the
     corresponding python data structure.
@@ -43,8 +85,9 @@ def yaml(input):
     :param input: the source of the yaml
     :type input: str, Path or IOBase
     """
+    backend = yaml_backend()
     try:
-        return ruamel.load(_data(input))
+        return cached("yaml." + backend.name, _data(input), backend.load)
     except Exception as e:
         print("Error parsing %s" % input)
         raise (e)
@@ -55,13 +98,29 @@ def yaml_all(input):
 
     :param input: the source of the yaml
     :type input: str, Path or IOBase"""
+    backend = yaml_backend()
     try:
-        return ruamel.load_all(_data(input))
+        return cached(
+            "yaml_all." + backend.name,
+            _data(input),
+            lambda text: list(backend.load_all(text)),
+        )
     except Exception as e:
         print("Error parsing %s" % input)
         raise (e)
 
 
+def yaml_iter(input):
+    """Like :py:func:`yaml_all` but returns a generator which reads
+    ``input`` as it goes, so only the document being parsed is ever in
+    memory.
+
+    :param input: the source of the yaml
+    :type input: str, Path or IOBase"""
+    with _stream(input) as stream:
+        yield from yaml_backend().load_all(stream)
+
+
 def hcl(input):
     """Parses ``input`` as a hcl code and returns the corresponding python dict.
 
@@ -125,15 +184,23 @@ def hcl(input):
 
     :param input: the source of the hcl
     :type input: str, Path or IOBase"""
-    return pyhcl.loads(_data(input))
+    return cached("hcl", _data(input), _pyhcl_loads)
+
+
+def _pyhcl_loads(text):
+    import hcl as pyhcl
+
+    return pyhcl.loads(text)
 
 
 def json(input):
     """Parses ``input`` as a single json object.
 
+    Parsed by the :py:mod:`json backend <p10s.json_backends>`.
+
     :param input: the source of the json
     :type input: str, Path or IOBase"""
-    return json_lib.loads(_data(input))
+    return cached("json", _data(input), lambda text: json_backend().loads(text))
 
 
 def load_file(filename):
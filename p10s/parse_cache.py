@@ -0,0 +1,109 @@
+"""Cache of parsed yaml, hcl and json.
+
+Scripts often parse the same shared templates, and with the daemon or
+the watcher, the same templates over and over again. :py:mod:`p10s.loads`
+keeps the results keyed by the parser and a hash of the text parsed,
+so the same text is only ever parsed once per process.
+
+Results are stored pickled. Every lookup unpickles a fresh copy, so
+callers can modify what they get back, and the size of the pickles is
+what's bounded (the least recently used are dropped first).
+
+When :py:meth:`Generator.generate <p10s.generator.Generator.generate>`
+is run with the build cache (see :py:mod:`p10s.cache`) the pickles are
+also written to ``.p10s-cache/parse/`` and shared across runs and with
+the parallel generator's worker processes.
+
+"""
+
+import hashlib
+import os
+import pickle
+from collections import OrderedDict
+from pathlib import Path
+
+from p10s.__version__ import __version__
+
+# NOTE the size of the pickles, the unpickled objects take 3 or 4
+# times as much memory.
+MAX_BYTES = 32 * 1024 * 1024
+
+
+class ParseCache:
+    def __init__(self, max_bytes=MAX_BYTES, directory=None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._pickles = OrderedDict()
+
+    def parse(self, parser, text, parse):
+        """Returns ``parse(text)``, or a copy of what it returned the
+        last time ``parser`` was given the same ``text``."""
+        data = text.encode("utf-8") if isinstance(text, str) else text
+        key = (parser, hashlib.sha256(data).hexdigest())
+        blob = self._pickles.get(key)
+        if blob is not None:
+            self._pickles.move_to_end(key)
+        else:
+            blob = self._read(key)
+            if blob is None:
+                self.misses += 1
+                result = parse(text)
+                blob = pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+                self._write(key, blob)
+                self._remember(key, blob)
+                return result
+            self._remember(key, blob)
+        self.hits += 1
+        return pickle.loads(blob)
+
+    def clear(self):
+        self._pickles.clear()
+        self.size = 0
+
+    def _remember(self, key, blob):
+        if len(blob) > self.max_bytes:
+            return
+        self._pickles[key] = blob
+        self.size += len(blob)
+        while self.size > self.max_bytes:
+            _, evicted = self._pickles.popitem(last=False)
+            self.size -= len(evicted)
+
+    def _path(self, key):
+        parser, digest = key
+        return Path(self.directory) / __version__ / parser / (digest + ".pickle")
+
+    def _read(self, key):
+        if self.directory is None:
+            return None
+        try:
+            with self._path(key).open("rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write(self, key, blob):
+        if self.directory is None:
+            return
+        path = self._path(key)
+        tmp = path.with_name(path.name + ".%d.tmp" % os.getpid())
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with tmp.open("wb") as f:
+                f.write(blob)
+            os.replace(str(tmp), str(path))
+        except OSError:
+            # NOTE the cache is only an optimization, a read only or
+            # full disk shouldn't stop anything being generated.
+            pass
+
+
+CACHE = ParseCache()
+
+
+def cached(parser, text, parse):
+    """:py:meth:`ParseCache.parse` on the process wide cache."""
+    return CACHE.parse(parser, text, parse)
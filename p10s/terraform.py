@@ -146,35 +146,184 @@ class Context(JSONContext):
             self.data = data
 
         self.strict = strict
+        # NOTE attribute -> {(kind, value): {key: None}}, built the first
+        # time find() is asked about the attribute, see find().
+        self._indexes = {}
 
         super().__init__(*args, **kwargs)
 
     def _merge_in(self, values):
         self.data = merge_dicts(self.data, values)
+        self._indexes = {}
         return self
 
     def add(self, block):
         if not isinstance(block, (list, tuple)):
             block = [block]
-        for b in block:
+        return self.extend(block)
+
+    def extend(self, blocks):
+        """Adds every block in the iterable ``blocks``, in order.
+
+        Equivalent to adding them one at a time, but each block's body
+        is put straight into place, the path leading to it (kind, type
+        and name) is only walked once, and that walk is also what finds
+        duplicates when ``strict`` is set.
+
+        :param blocks: an iterable of TerraformBlock
+        """
+        for b in blocks:
+            key = _direct_key(b)
+            if key is not None:
+                self._put(key, b)
+                if self._indexes:
+                    self._index_block(tuple(key))
+                continue
             if self.strict:
                 existing = self.lookup(b._key())
                 if existing is not None:
-                    raise DuplicateBlockError(existing, block)
+                    raise DuplicateBlockError(existing, b)
             self._merge_in(b.data)
         return self
 
+    def _put(self, key, block):
+        """``merge_dicts(self.data, block.data)``, for a block whose data
+        is just the path ``key`` to its body."""
+        here, theirs = self.data, block.data
+        last = len(key) - 1
+        for depth, part in enumerate(key):
+            new = theirs[part]
+            existing = here.get(part)
+            if depth == last and self.strict and existing is not None:
+                raise DuplicateBlockError(existing, block)
+            if not (isinstance(new, dict) and isinstance(existing, dict)):
+                here[part] = new
+                return
+            if existing is new:
+                return
+            if depth == last:
+                merge_dicts(existing, new)
+                return
+            here, theirs = existing, new
+
     def lookup(self, key):
-        def _rec(here, path):
-            if len(path) == 0:
-                return here
-            if isinstance(here, collections.abc.Mapping):
-                if path[0] in here:
-                    first = path.pop(0)
-                    return _rec(here[first], path)
+        """Returns the value at ``key``, a list of keys leading into the
+        context's data, or None if there isn't one."""
+        here = self.data
+        for part in key:
+            if not isinstance(here, collections.abc.Mapping) or part not in here:
+                return None
+            here = here[part]
+        return here
+
+    def get_block(self, kind, *names):
+        """Returns the block ``kind`` (with the given type and name, for
+        the kinds that have them) or None if there isn't one. The
+        block's body is the one in the context, changing it changes
+        the context.
+
+        .. code-block:: python
+
+            c.get_block("module", "vpc").body["source"]
+        """
+        body = self.lookup([kind, *names])
+        if body is None or kind not in BLOCKS:
             return None
+        return BLOCKS[kind](*names, body)
+
+    def get_resource(self, type, name):
+        """Returns the resource ``type`` ``name``, or None, see
+        :py:meth:`get_block`."""
+        return self.get_block("resource", type, name)
+
+    def find(self, kind, type=None, where=None):
+        """Returns a list of the ``kind`` blocks (of type ``type``, if
+        given) whose bodies have all the keys and values in the dict
+        ``where``:
+
+        .. code-block:: python
 
-        return _rec(self.data, key)
+            c.find("module", where={"source": "./modules/vpc/"})
+            c.find("resource", "aws_instance", {"ami": ami})
+
+        The first time an attribute is used in ``where`` the context
+        builds an index of the values all its blocks have for it,
+        kept up to date as blocks are added, so later ``find`` calls on
+        the same attribute only look at the blocks that match.
+
+        Changes made directly to ``data``, or to the bodies of blocks
+        already added, which give a block an indexed value it didn't
+        have aren't seen by the index until :py:meth:`reindex` is
+        called.
+        """
+        where = where or {}
+        keys = None
+        for attribute, value in where.items():
+            try:
+                keys = self._index(attribute).get((kind, value), {})
+            except TypeError:
+                # NOTE unhashable values aren't indexed.
+                continue
+            break
+        if keys is None:
+            keys = self._keys(kind, type)
+        found = []
+        for key in keys:
+            if type is not None and key[1] != type:
+                continue
+            body = self.lookup(key)
+            if not isinstance(body, dict):
+                continue
+            if all(
+                attribute in body and body[attribute] == value
+                for attribute, value in where.items()
+            ):
+                found.append(BLOCKS[kind](*key[1:], body))
+        return found
+
+    def reindex(self):
+        """Drops the indexes :py:meth:`find` built, they'll be rebuilt,
+        from the current data, as needed."""
+        self._indexes = {}
+
+    def _keys(self, kind, type=None):
+        """The keys of all the ``kind`` blocks in the context."""
+        cls = BLOCKS.get(kind)
+        here = self.data.get(kind)
+        if cls is None or not isinstance(here, dict):
+            return []
+        if issubclass(cls, NoArgsBlock):
+            return [(kind,)]
+        if issubclass(cls, NameBlock):
+            return [(kind, name) for name in here]
+        types = here if type is None else [type]
+        return [
+            (kind, type, name)
+            for type in types
+            if isinstance(here.get(type), dict)
+            for name in here[type]
+        ]
+
+    def _index(self, attribute):
+        index = self._indexes.get(attribute)
+        if index is None:
+            index = self._indexes[attribute] = {}
+            for kind in self.data:
+                for key in self._keys(kind):
+                    self._add_to_index(index, attribute, key)
+        return index
+
+    def _index_block(self, key):
+        for attribute, index in self._indexes.items():
+            self._add_to_index(index, attribute, key)
+
+    def _add_to_index(self, index, attribute, key):
+        body = self.lookup(key)
+        if isinstance(body, dict) and attribute in body:
+            try:
+                index.setdefault((key[0], body[attribute]), {})[key] = None
+            except TypeError:
+                pass
 
     def __iadd__(self, block):
         """Add ``block`` to the context's data, destructively modifies ``self``
@@ -203,6 +352,21 @@ class Context(JSONContext):
         return AutoVariable(self)
 
 
+def _direct_key(block):
+    """The key of ``block``, if its data is nothing but the path to its
+    body (which is how the blocks build it), None otherwise."""
+    try:
+        key = block._key()
+    except NotImplementedError:
+        return None
+    here = block.data
+    for part in key:
+        if not isinstance(here, dict) or len(here) != 1 or part not in here:
+            return None
+        here = here[part]
+    return key
+
+
 class DuplicateBlockError(ValueError):
     def __init__(self, existing, new_block):
         self.existing = existing
@@ -477,6 +641,13 @@ class Data(TypeNameBlock):
     KIND = "data"
 
 
+# NOTE kind -> class, for the blocks the context hands back.
+BLOCKS = {
+    cls.KIND: cls
+    for cls in (Terraform, Locals, Variable, Output, Module, Provider, Resource, Data)
+}
+
+
 class HCLParseError(Exception):
     def __init__(self, data, error=None):
         self.data = data
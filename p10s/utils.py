@@ -1,34 +1,41 @@
 def merge_dicts(*args):
     """Creates a new dict by merging together the values in
-    ``args``. Values to the "right" over ride values in the "left"."""
-    if len(args) == 0:
-        return {}
-    elif len(args) == 1:
-        return args[0]
-    else:
-        args = list(args)
-        first = args.pop(0)
-        return _merge_dicts(first, merge_dicts(*args))
+    ``args``. Values to the "right" over ride values in the "left".
 
+    The first dict is modified in place and returned, see
+    :py:func:`merge_many`."""
+    return merge_many(args)
 
-def _merge_dicts(a, b):
-    """Copy values from B into A. destructively modifies A."""
 
-    def rec(a, b):
-        for k in b.keys():
-            new = b[k]
-            if isinstance(new, dict):
-                existing = a.get(k, a)
-                if existing is a:
-                    a[k] = new
-                else:
-                    if isinstance(existing, dict):
-                        rec(existing, new)
-                    else:
-                        a[k] = new
-            else:
-                a[k] = new
+def merge_many(dicts):
+    """Merges every dict in the iterable ``dicts``, in order, into the
+    first one, which is modified in place and returned (an empty
+    iterable gives a new, empty, dict).
 
-    rec(a, b)
+    Nested dicts are merged key by key, anything else, including a
+    dict replacing a non dict or vice versa, replaces what was there.
+    Dicts from the later arguments may end up in the result as they
+    are, and then be modified by the merging of the ones after them.
 
-    return a
+    There is no recursion, so neither the number of dicts nor how
+    deeply nested they are is limited by python's recursion limit.
+    """
+    dicts = iter(dicts)
+    result = next(dicts, None)
+    if result is None:
+        return {}
+    # NOTE pairs of (into, from) dicts still to merge, reused for every
+    # argument.
+    stack = []
+    for other in dicts:
+        stack.append((result, other))
+        while stack:
+            a, b = stack.pop()
+            for key, new in b.items():
+                if isinstance(new, dict):
+                    existing = a.get(key)
+                    if isinstance(existing, dict) and existing is not new:
+                        stack.append((existing, new))
+                        continue
+                a[key] = new
+    return result
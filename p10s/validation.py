@@ -0,0 +1,179 @@
+"""Validating kubernetes objects, offline, against their json schemas.
+
+A typo in an object usually only shows up when ``kubectl apply``
+refuses it. :py:meth:`k8s.Context.validate
+<p10s.kubernetes.Context.validate>` checks every object against the
+json schema of its apiVersion and kind instead, and raises a
+:py:class:`ValidationError` pointing at what's wrong:
+
+.. code-block:: text
+
+    deploy.yaml #0 Deployment web/nginx: $.spec.replicas: 'two' is not of type 'integer'
+
+The schemas are read from a directory, which would normally be
+vendored in the repository, laid out as the ``*-standalone-strict``
+(or ``*-standalone``) directories of `kubernetes-json-schema
+<https://github.com/yannh/kubernetes-json-schema>`_ are, with a
+directory per kubernetes version and a file per apiVersion and kind
+(``deployment-apps-v1.json``, ``service-v1.json``, ...). It's given
+with the ``P10S_K8S_SCHEMAS`` environment variable (or ``p10s validate
+--schemas``) and the version with ``P10S_K8S_VERSION`` (``1.29.0``
+looks for a ``v1.29.0-standalone-strict``, or ``v1.29.0-standalone``,
+directory in there); without a version the files are expected in
+``P10S_K8S_SCHEMAS`` itself. Scripts run in their own directory, so a
+relative ``P10S_K8S_SCHEMAS`` is relative to each script's (``p10s
+validate --schemas`` is relative to the current directory). Objects of
+kinds there's no schema for, custom resources usually, aren't checked.
+
+Each schema is read, and its validator built, once per process, the
+first time an object of its kind is validated, whichever context or
+script it's in.
+
+Besides calling ``validate()`` from a script, with ``P10S_VALIDATE=1``
+in the environment (which is what ``p10s generate --validate`` sets)
+every k8s.Context validates its objects before writing anything. ``p10s
+validate`` compiles the scripts and validates their objects without
+rendering them at all, spread over as many processes as ``p10s
+generate`` would.
+
+Validating needs jsonschema, see :doc:`installation`.
+
+"""
+
+import json
+import os
+from pathlib import Path
+
+from p10s.json_backends import backend as json_backend
+
+SCHEMAS_ENV = "P10S_K8S_SCHEMAS"
+VERSION_ENV = "P10S_K8S_VERSION"
+VALIDATE_ENV = "P10S_VALIDATE"
+
+
+class ValidationError(Exception):
+    """Raised when objects don't match their schemas. ``errors`` is a
+    list of ``(object, path, message)`` tuples, ``path`` being the
+    JSONPath of what's wrong in the object."""
+
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+    def __str__(self):
+        return "\n".join("%s: %s: %s" % error for error in self.errors)
+
+
+class Schemas:
+    """The schemas in ``directory`` for kubernetes ``version``, see
+    the module documentation."""
+
+    def __init__(self, directory, version=None):
+        directory = Path(directory)
+        if version is None:
+            self.root = directory
+        else:
+            if version[0].isdigit():
+                version = "v" + version
+            candidates = [
+                directory / (version + suffix)
+                for suffix in ("-standalone-strict", "-standalone")
+            ]
+            self.root = next((c for c in candidates if c.is_dir()), candidates[0])
+        if not self.root.is_dir():
+            raise ValueError("No kubernetes schemas in %s." % self.root)
+        self._validators = {}
+
+    def path(self, api_version, kind):
+        """The file with the schema for ``api_version`` ``kind``."""
+        group, _, version = api_version.rpartition("/")
+        name = [kind]
+        if group:
+            # NOTE networking.k8s.io/v1 is networking-v1
+            name.append(group.split(".")[0])
+        name.append(version)
+        return self.root / ("-".join(name).lower() + ".json")
+
+    def validator(self, api_version, kind):
+        """The jsonschema validator for ``api_version`` ``kind``, or None
+        if there's no schema for it."""
+        key = (api_version, kind)
+        if key not in self._validators:
+            self._validators[key] = self._compile(self.path(api_version, kind))
+        return self._validators[key]
+
+    def _compile(self, path):
+        try:
+            from jsonschema.validators import validator_for
+        except ImportError as e:
+            raise ImportError(
+                "Validating kubernetes objects needs jsonschema, "
+                "pip install pyterranetes[validate]."
+            ) from e
+        try:
+            text = path.read_text()
+        except FileNotFoundError:
+            return None
+        schema = json_backend().loads(text)
+        return validator_for(schema)(schema)
+
+    def errors(self, document):
+        """Returns a list of ``(path, message)`` pairs, one for each thing
+        wrong with ``document``, empty if there's nothing wrong or no
+        schema to check it against."""
+        if not isinstance(document, dict):
+            return [("$", "%r is not an object" % (document,))]
+        missing = [
+            ("$", "%r is a required property" % field)
+            for field in ("apiVersion", "kind")
+            if not isinstance(document.get(field), str)
+        ]
+        if missing:
+            return missing
+        validator = self.validator(document["apiVersion"], document["kind"])
+        if validator is None:
+            return []
+        return sorted(
+            (json_path(error.absolute_path), error.message)
+            for error in validator.iter_errors(document)
+        )
+
+
+def json_path(path):
+    """The JSONPath, ``$.spec.containers[0].name``, of the keys and
+    indexes in ``path``."""
+    parts = ["$"]
+    for part in path:
+        if isinstance(part, int):
+            parts.append("[%d]" % part)
+        elif part.isidentifier():
+            parts.append("." + part)
+        else:
+            parts.append("[%s]" % json.dumps(part))
+    return "".join(parts)
+
+
+_SCHEMAS = {}
+
+
+def schemas():
+    """The :py:class:`Schemas` from ``P10S_K8S_SCHEMAS`` and
+    ``P10S_K8S_VERSION``, shared by everything validating in this
+    process."""
+    directory = os.environ.get(SCHEMAS_ENV)
+    if not directory:
+        raise ValueError(
+            "No kubernetes schemas to validate against, set %s." % SCHEMAS_ENV
+        )
+    # NOTE the environment is read on every call, as the daemon runs
+    # each request with the client's.
+    key = (os.path.abspath(directory), os.environ.get(VERSION_ENV) or None)
+    if key not in _SCHEMAS:
+        _SCHEMAS[key] = Schemas(*key)
+    return _SCHEMAS[key]
+
+
+def validate_default():
+    """Whether contexts validate their objects when rendered, see the
+    module documentation."""
+    return os.environ.get(VALIDATE_ENV, "") not in ("", "0")
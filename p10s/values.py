@@ -1,12 +1,18 @@
 import os
+from collections import namedtuple
 from collections.abc import MutableMapping
 from contextlib import contextmanager
 from copy import deepcopy
 from pathlib import Path
 
+from p10s.dependencies import record
 from p10s.loads import load_file
 from p10s.utils import merge_dicts
 
+# NOTE past this many layers copy() flattens them, so lookups don't
+# keep getting slower in a long running process.
+MAX_DEPTH = 16
+
 
 class Values(MutableMapping):
     """Class for storing p10s value mappings.
@@ -24,14 +30,33 @@ class Values(MutableMapping):
 
         VALUES = Values.from_files(".") + Values.from_environ(".")
 
+    Copying a Values, which :py:func:`values` does every time, takes
+    time proportional to what was set, merged in or read since it was
+    last copied, the copy shares the rest with the original. Reading a
+    key gives the reader its own copy of that key's value, so changes
+    to it aren't seen by other copies either. Whatever a Values was
+    given, or handed out, is its storage until it's next copied, when
+    it's deep copied, so that changes made to it afterwards don't show
+    up in the copies, or in the original.
 
     """
 
     def __init__(self, values=None):
-        if values is not None:
-            self.values = values
-        else:
-            self.values = {}
+        # NOTE a Values is a stack of layers. ``_own`` holds this layer's
+        # values, ``_pending`` the dicts merged into keys which are only
+        # in the layers below (merged on first read, so adding a dict
+        # costs the size of the dict, not of the values underneath) and
+        # ``_deleted`` the keys which were deleted from the layers
+        # below. The layers below are frozen: copy() moves whatever we
+        # have into a new layer, shared with the copy, and both carry
+        # on with an empty one on top of it. Anything in ``_own`` and
+        # ``_pending`` may be held by the caller too, they're deep copied
+        # before being frozen.
+        self._own = values if values is not None else {}
+        self._pending = {}
+        self._deleted = set()
+        self._base = None
+        self._depth = 0
 
     @classmethod
     def from_files(cls, basedir):
@@ -42,30 +67,27 @@ class Values(MutableMapping):
         (up until the file system's root) will be collected and parsed and
         merged. The merging is top down, so values specifed in files closer to
         basedir will over ride values specified in a higher up values file.
+
+        The merged values of every directory are kept, in
+        ``DIRECTORY_CACHE``, and reused for as long as neither its
+        ``values.yaml`` nor any of those above it change, so scripts
+        sharing directories only pay for the files they don't share.
         """
-        basedir = Path(basedir)
+        basedir = Path(basedir).absolute()
         if not basedir.exists():
             raise FileNotFoundError("basedir %s does not exist" % basedir)
-        here = basedir
-
-        values_files = []
 
         if basedir.is_file():
-            basedir = basedir.parent()
+            basedir = basedir.parent
 
-        while True:
-            if (here / "values.yaml").exists():
-                values_files.insert(0, here / "values.yaml")
-            if here == here.parent:
-                break
-            else:
-                here = here.parent
+        directories = [basedir]
+        directories.extend(basedir.parents)
 
-        values = {}
-        for file in values_files:
-            merge_dicts(values, load_file(file))
+        directory = None
+        for here in reversed(directories):
+            directory = _directory_values(here, directory)
 
-        return cls(values)
+        return directory.values.copy()
 
     @classmethod
     def from_environ(cls):
@@ -75,6 +97,22 @@ class Values(MutableMapping):
         # is on that and this feels safer. 20181220:mb
         return cls(dict(os.environ))
 
+    @property
+    def values(self):
+        """All the values as a plain dict, which ``self`` keeps using as
+        its storage (so changes to the dict are changes to ``self``)
+        until it's next copied."""
+        if self._base is not None or self._pending:
+            for key in list(self):
+                self._resolve(key)
+            self._base, self._pending, self._deleted, self._depth = None, {}, set(), 0
+        return self._own
+
+    @values.setter
+    def values(self, values):
+        self._own = values
+        self._base, self._pending, self._deleted, self._depth = None, {}, set(), 0
+
     def __add__(self, other):
         """Returns a new values containg the merge of ``other`` into this
         object (key/value pairs in ``other`` replace equally named
@@ -84,35 +122,156 @@ class Values(MutableMapping):
 
     def __iadd__(self, other):
         """Modifies ``self`` by merging in the values of ``other``"""
-        self.values = merge_dicts(self.values, other)
+        for key in other.keys():
+            new = other[key]
+            if not isinstance(new, dict) or key in self._deleted:
+                self[key] = new
+            elif key in self._own:
+                if isinstance(self._own[key], dict):
+                    merge_dicts(self._own[key], new)
+                else:
+                    self._own[key] = new
+            elif self._base is None:
+                self._own[key] = new
+            else:
+                self._pending.setdefault(key, []).append(new)
         return self
 
     def copy(self):
-        return Values(values=deepcopy(self.values))
+        """Returns a copy of ``self``, in constant time. Changes to either
+        one don't affect the other."""
+        copy = Values()
+        copy._base = self._freeze()
+        copy._depth = self._depth
+        return copy
+
+    def _freeze(self):
+        if self._own or self._pending or self._deleted:
+            layer = Values()
+            layer._own, layer._pending, layer._deleted = (
+                deepcopy(self._own),
+                deepcopy(self._pending),
+                self._deleted,
+            )
+            layer._base, layer._depth = self._base, self._depth
+            if layer._depth > MAX_DEPTH:
+                layer.values
+            self._own, self._pending, self._deleted = {}, {}, set()
+            self._base, self._depth = layer, layer._depth + 1
+        return self._base
+
+    def _has(self, key):
+        if key in self._own or key in self._pending:
+            return True
+        if key in self._deleted or self._base is None:
+            return False
+        return self._base._has(key)
+
+    def _peek(self, key):
+        """The value of ``key`` without copying it. Only for the frozen
+        layers, whose values are never handed out."""
+        if key in self._own:
+            return self._own[key]
+        if key in self._pending:
+            return self._resolve(key)
+        if key in self._deleted or self._base is None:
+            raise KeyError(key)
+        return self._base._peek(key)
+
+    def _resolve(self, key):
+        """Copies ``key`` up into ``_own``, merging in any pending dicts,
+        and returns it."""
+        if key in self._own:
+            return self._own[key]
+        value = None
+        if key not in self._deleted and self._base is not None and self._base._has(key):
+            value = self._base._peek(key)
+            if isinstance(value, (dict, list, set)):
+                value = deepcopy(value)
+        elif key not in self._pending:
+            raise KeyError(key)
+        for new in self._pending.pop(key, []):
+            if isinstance(value, dict):
+                merge_dicts(value, new)
+            else:
+                value = new
+        self._own[key] = value
+        return value
+
+    def __contains__(self, key):
+        return self._has(key)
 
     def __getitem__(self, key):
-        return self.values[key]
+        return self._resolve(key)
 
     def __setitem__(self, key, value):
-        self.values[key] = value
+        self._own[key] = value
+        self._pending.pop(key, None)
+        self._deleted.discard(key)
 
     def __delitem__(self, key):
-        del self.values[key]
+        if not self._has(key):
+            raise KeyError(key)
+        self._own.pop(key, None)
+        self._pending.pop(key, None)
+        if self._base is not None and self._base._has(key):
+            self._deleted.add(key)
 
     def __iter__(self):
-        return iter(self.values)
+        keys = dict.fromkeys(self._own)
+        keys.update(dict.fromkeys(self._pending))
+        if self._base is not None:
+            keys.update(dict.fromkeys(k for k in self._base if k not in self._deleted))
+        return iter(keys)
 
     def __len__(self):
-        return len(self.values)
+        return sum(1 for _ in self)
 
     def __keytransform__(self, key):
         return key
 
     def set_value(self, key, value):
-        self.values[key] = value
+        self[key] = value
 
     def get_value(self, key, default=None):
-        return self.values.get(key, default)
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+_Directory = namedtuple("_Directory", ["stamp", "parent", "values"])
+
+# NOTE maps a directory to its _Directory: the stat of its values.yaml
+# (None if there isn't one), the _Directory of its parent, and the
+# values of both merged together. Entries are only ever replaced, so
+# an entry whose parent isn't the parent's current entry is stale.
+DIRECTORY_CACHE = {}
+
+
+def _stamp(path):
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _directory_values(here, parent):
+    """Returns the _Directory for ``here``, rebuilding it from ``parent``
+    if ``here``'s values.yaml, or any of the ones above it, changed."""
+    file = here / "values.yaml"
+    # NOTE record the file even if it isn't there, creating it
+    # changes the values from_files returns.
+    record(file)
+    stamp = _stamp(file)
+    directory = DIRECTORY_CACHE.get(here)
+    if directory is None or directory.stamp != stamp or directory.parent is not parent:
+        values = parent.values.copy() if parent is not None else Values()
+        if stamp is not None:
+            values += load_file(file)
+        directory = DIRECTORY_CACHE[here] = _Directory(stamp, parent, values)
+    return directory
 
 
 global VALUES
@@ -144,8 +303,10 @@ def values(*args, **kwargs):
     new += Values(values=kwargs)
 
     VALUES = new
-    yield
-    VALUES = old
+    try:
+        yield
+    finally:
+        VALUES = old
 
 
 def value(key, default=None):
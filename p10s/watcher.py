@@ -1,36 +1,204 @@
+import os
+import re
 import signal
-import subprocess
+import threading
 import time
+import traceback
 from pathlib import Path
 
-import __main__ as main
 from watchdog.events import FileSystemEventHandler
 from watchdog.observers import Observer
 
+from p10s.cache import BuildCache
+from p10s.generator import Generator
+
+
+def parse_duration(text):
+    """Parses durations like ``150ms``, ``0.5s`` or ``2`` (seconds)
+    and returns the number of seconds as a float."""
+    match = re.fullmatch(r"\s*([0-9]*\.?[0-9]+)\s*(ms|s)?\s*", str(text))
+    if match is None:
+        raise ValueError("Invalid duration %r" % text)
+    number, unit = match.groups()
+    return float(number) / (1000 if unit == "ms" else 1)
+
+
+class RebuildQueue:
+    """Coalesces the events for a script into a single rebuild.
+
+    Editors tend to produce bursts of created/modified/moved events for
+    a single save. A script is only handed out by :py:meth:`pop_ready`
+    once ``debounce`` seconds have passed without any new event for it,
+    a newer request for a script replaces the one already queued.
+
+    Events arrive on the observer's thread and are consumed on the
+    watcher's, hence the lock.
+    """
+
+    def __init__(self, debounce):
+        self.debounce = debounce
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def put(self, path, *message):
+        with self._lock:
+            self._pending[path] = (time.monotonic() + self.debounce, message)
+
+    def pop_ready(self):
+        """Removes and returns, oldest first, the ``(path, message)``
+        pairs whose debounce window has passed."""
+        now = time.monotonic()
+        with self._lock:
+            ready = sorted(
+                (deadline, path, message)
+                for path, (deadline, message) in self._pending.items()
+                if deadline <= now
+            )
+            for _, path, _ in ready:
+                del self._pending[path]
+        return [(path, message) for _, path, message in ready]
+
+    def timeout(self, default):
+        """Seconds until the next queued rebuild is due, at most ``default``."""
+        with self._lock:
+            if not self._pending:
+                return default
+            deadline = min(deadline for deadline, _ in self._pending.values())
+        return max(0, min(default, deadline - time.monotonic()))
+
+    def __len__(self):
+        return len(self._pending)
+
+
+def _key(path):
+    return os.path.realpath(str(path))
+
+
+class DependencyIndex:
+    """Reverse dependency index: maps each file some script depends on
+    (``values.yaml`` files, library modules, loaded templates, etc.) to
+    the scripts which depend on it.
+
+    Updated from the observer's thread and the watcher's, hence the
+    lock.
+    """
+
+    def __init__(self):
+        self._scripts = {}
+        self._dependencies = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_cache(cls, root):
+        """Builds an index from the build cache in ``root``, if there is
+        one."""
+        return cls._from_build_cache(BuildCache(root))
+
+    @classmethod
+    def _from_build_cache(cls, cache):
+        index = cls()
+        for script, entry in cache.scripts.items():
+            index.update(script, [i for i in entry["inputs"] if i != script])
+        return index
+
+    @classmethod
+    def from_scripts(cls, root):
+        """Builds an index of every script in ``root``. Scripts the build
+        cache is fresh for, whose inputs haven't changed since they were
+        last generated with ``--cache``, are taken from it, the others
+        are compiled, without rendering, so that changing one of their
+        dependencies rebuilds them all the same. Scripts which fail to
+        compile keep what the build cache knows about them, if anything,
+        until they're rebuilt."""
+        cache = BuildCache(root)
+        index = cls._from_build_cache(cache)
+        generator = Generator()
+        for filename in generator._p10s_scripts(Path(root)):
+            if cache.is_fresh(filename):
+                continue
+            try:
+                compiled = generator.dependencies(filename)
+            except Exception:
+                print("Can't compile %s, not tracking its dependencies." % filename)
+                continue
+            for script, dependencies in compiled.items():
+                index.update(script, dependencies)
+        return index
+
+    def update(self, script, dependencies):
+        """Replaces whatever we knew about ``script`` with ``dependencies``."""
+        script = _key(script)
+        dependencies = set(_key(d) for d in dependencies)
+        with self._lock:
+            for dependency in self._dependencies.get(script, set()):
+                self._scripts[dependency].discard(script)
+            for dependency in dependencies:
+                self._scripts.setdefault(dependency, set()).add(script)
+            self._dependencies[script] = dependencies
+
+    def scripts(self, dependency):
+        """Returns the, sorted, scripts which depend on ``dependency``."""
+        with self._lock:
+            return sorted(self._scripts.get(_key(dependency), ()))
+
 
 class PyterranetesEventHandler(FileSystemEventHandler):
-    def __init__(self, ignore_dotfiles, verbose=False):
+    def __init__(self, ignore_dotfiles, verbose=False, queue=None, index=None):
         super().__init__()
         self.ignore_dotfiles = ignore_dotfiles
         self.verbose = verbose
+        self.queue = queue
+        self.index = index if index is not None else DependencyIndex()
 
-    def _maybe_generate(self, filename, *message):
+    def _wants(self, path):
+        if self.ignore_dotfiles and path.name.startswith("."):
+            return False
+        return path.name.endswith(".p10s")
+
+    def _schedule(self, filename, *message):
+        """Queues a rebuild of ``filename``, if it's a script, or of the
+        scripts depending on it. Rebuilds right away if there's no
+        queue."""
         path = Path(filename)
         if self.ignore_dotfiles and path.name.startswith("."):
             return False
-        if path.name.endswith(".p10s"):
-            print(*message)
-            res = subprocess.run(
-                [
-                    "python",
-                    main.__file__,
-                    "generate",
-                    "-v" if self.verbose else "",
-                    filename,
-                ]
-            )
-            print("Done.")
-            return res.returncode == 0, res
+        if self._wants(path):
+            rebuilds = [(filename, message)]
+        else:
+            rebuilds = [
+                (script, ("%s changed, rebuilding %s" % (filename, script),))
+                for script in self.index.scripts(filename)
+            ]
+        for script, script_message in rebuilds:
+            if self.queue is None:
+                self._maybe_generate(script, *script_message)
+            else:
+                self.queue.put(script, *script_message)
+        return len(rebuilds) > 0
+
+    def _maybe_generate(self, filename, *message):
+        path = Path(filename)
+        if not self._wants(path):
+            return False
+        if not path.exists():
+            # deleted, or moved away, while its rebuild was queued
+            return False
+        print(*message)
+        # NOTE generating in this process, instead of running `p10s
+        # generate`, saves us starting python and importing
+        # everything again for every change. the generator takes
+        # care of resetting the cwd, sys.path, library modules and
+        # values between scripts.
+        try:
+            summary = Generator().generate(path, verbose=self.verbose)
+        except Exception as e:
+            traceback.print_exc()
+            print("Failed.")
+            return False, e
+        for script, dependencies in summary.dependencies.items():
+            self.index.update(script, dependencies)
+        print("Done.")
+        return True, summary
 
     def dispatch(self, event):
         if event.is_directory:
@@ -39,39 +207,42 @@ class PyterranetesEventHandler(FileSystemEventHandler):
             super().dispatch(event)
 
     def on_created(self, event):
-        self._maybe_generate(event.src_path, "%s created. building." % event.src_path)
+        self._schedule(event.src_path, "%s created. building." % event.src_path)
 
     def on_modified(self, event):
-        self._maybe_generate(event.src_path, "%s modified, rebuilding" % event.src_path)
+        self._schedule(event.src_path, "%s modified, rebuilding" % event.src_path)
 
     def on_moved(self, event):
-        self._maybe_generate(
+        self._schedule(
             event.dest_path,
             "%s moved, rebuilding at %s" % (event.src_path, event.dest_path),
         )
 
 
 class Watcher:
-    def __init__(self, directory, ignore_dotfiles):
+    def __init__(self, directory, ignore_dotfiles, debounce=0.15):
         self.directory = directory
         self.ignore_dotfiles = ignore_dotfiles
         self.run = True
         self.observer = Observer()
+        self.queue = RebuildQueue(debounce=debounce)
 
     def watch(self, verbose=False):
         if verbose:
             print("Watching for changes in", self.directory, "and below.")
         dirname = str(Path(self.directory).resolve())
-        self.observer.schedule(
-            PyterranetesEventHandler(
-                ignore_dotfiles=self.ignore_dotfiles, verbose=verbose
-            ),
-            dirname,
-            recursive=True,
+        handler = PyterranetesEventHandler(
+            ignore_dotfiles=self.ignore_dotfiles,
+            verbose=verbose,
+            queue=self.queue,
+            index=DependencyIndex.from_scripts(dirname),
         )
+        self.observer.schedule(handler, dirname, recursive=True)
         self.observer.start()
         while self.run:
-            time.sleep(0.2)
+            for filename, message in self.queue.pop_ready():
+                handler._maybe_generate(filename, *message)
+            time.sleep(self.queue.timeout(default=0.2))
         self.observer.join()
 
     def install_signal_handlers(self):
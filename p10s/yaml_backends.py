@@ -0,0 +1,292 @@
+"""Parsing and emitting yaml, as fast as the installed libraries allow.
+
+ruamel.yaml, in pure python mode, is what pyterranetes has always used
+and is what defines the output: YAML 1.2 semantics (``yes`` and
+``on`` are strings, ``0777`` is 777), keys sorted, unicode written as
+is, block style, lines wrapped at column 80. It's also slow on large
+manifests, so when PyYAML is installed with libyaml the parsing and
+emitting is done by libyaml instead, with the python side of PyYAML
+adjusted to produce the same data, and the same bytes, as ruamel.
+
+The backend is chosen the first time it's needed and can be forced with
+the ``P10S_YAML_BACKEND`` environment variable:
+
+``libyaml``
+    PyYAML's C loader and dumper, the default when available.
+``ruamel``
+    ruamel.yaml. Loading uses ruamel's own C parser if
+    ``ruamel.yaml.clib`` is installed, emitting is always pure python
+    (ruamel's C emitter formats multi-line strings differently).
+
+Some things libyaml writes differently: characters outside the Basic
+Multilingual Plane (emoji, for example), which it always escapes, line
+breaks other than ``\\n`` (``\\r``, ``\\x85``, ``\\u2028`` and
+``\\u2029``), documents which are a single scalar and, as the two wrap
+lines differently, anything which goes past column 80. Whatever has any
+of these in it is written by ruamel instead, so that the output is the
+same either way.
+
+Objects appearing more than once are written once, with an anchor, and
+then referred to with an alias, unless ``dump_all`` is called with
+``aliases=False``, in which case they're written out in full every
+time.
+
+"""
+
+import os
+import re
+
+BACKEND_ENV = "P10S_YAML_BACKEND"
+
+# NOTE the YAML 1.2 core schema, as ruamel.yaml implements it, in
+# place of PyYAML's YAML 1.1 resolvers.
+YAML_1_2_RESOLVERS = [
+    (
+        "tag:yaml.org,2002:bool",
+        r"^(?:true|True|TRUE|false|False|FALSE)$",
+        "tTfF",
+    ),
+    (
+        "tag:yaml.org,2002:float",
+        r"""^(?:
+         [-+]?(?:[0-9][0-9_]*)\.[0-9_]*(?:[eE][-+]?[0-9]+)?
+        |[-+]?(?:[0-9][0-9_]*)(?:[eE][-+]?[0-9]+)
+        |[-+]?\.[0-9_]+(?:[eE][-+][0-9]+)?
+        |[-+]?\.(?:inf|Inf|INF)
+        |\.(?:nan|NaN|NAN))$""",
+        "-+0123456789.",
+    ),
+    (
+        "tag:yaml.org,2002:int",
+        r"""^(?:[-+]?0b[0-1_]+
+        |[-+]?0o?[0-7_]+
+        |[-+]?[0-9_]+
+        |[-+]?0x[0-9a-fA-F_]+)$""",
+        "-+0123456789",
+    ),
+    ("tag:yaml.org,2002:merge", r"^(?:<<)$", "<"),
+    (
+        "tag:yaml.org,2002:null",
+        r"""^(?: ~
+        |null|Null|NULL
+        | )$""",
+        ["~", "n", "N", ""],
+    ),
+    (
+        "tag:yaml.org,2002:timestamp",
+        r"""^(?:[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]
+        |[0-9][0-9][0-9][0-9] -[0-9][0-9]? -[0-9][0-9]?
+        (?:[Tt]|[ \t]+)[0-9][0-9]?
+        :[0-9][0-9] :[0-9][0-9] (?:\.[0-9]*)?
+        (?:[ \t]*(?:Z|[-+][0-9][0-9]?(?::[0-9][0-9])?))?)$""",
+        "0123456789",
+    ),
+    ("tag:yaml.org,2002:value", r"^(?:=)$", "="),
+]
+
+
+class RuamelBackend:
+    name = "ruamel"
+
+    def __init__(self):
+        from ruamel.yaml import YAML
+        from ruamel.yaml.representer import SafeRepresenter
+
+        class NoAliasRepresenter(SafeRepresenter):
+            def ignore_aliases(self, data):
+                return True
+
+        self.loader = YAML(typ="safe")
+        self.dumpers = {}
+        for aliases, representer in [
+            (True, SafeRepresenter),
+            (False, NoAliasRepresenter),
+        ]:
+            dumper = YAML(typ="safe", pure=True)
+            dumper.Representer = representer
+            dumper.default_flow_style = False
+            self.dumpers[aliases] = dumper
+
+    def load(self, text):
+        return self.loader.load(text)
+
+    def load_all(self, text):
+        return self.loader.load_all(text)
+
+    def dump_all(self, documents, stream, aliases=True):
+        self.dumpers[aliases].dump_all(documents, stream)
+
+
+class _RuamelOnly(Exception):
+    """Raised, when dumping with libyaml, by strings which libyaml
+    doesn't write the way ruamel does, see the module documentation."""
+
+
+# NOTE the characters, besides \r, which _RuamelOnly is raised for.
+_RUAMEL_ONLY = re.compile("[\x85\u2028\u2029\U00010000-\U0010ffff]")
+
+# NOTE the emitters only wrap, or move a value to the line after its
+# key, what would go past column 80, libyaml's output has a line longer
+# than that wherever they may differ.
+_LONG_LINE = re.compile(r"^.{81}", re.M)
+
+
+class LibYAMLBackend:
+    name = "libyaml"
+
+    def __init__(self):
+        self.Loader, self.Dumper, self.NoAliasDumper = _libyaml_classes()
+        self._ruamel = None
+
+    def load(self, text):
+        import yaml
+
+        return yaml.load(text, Loader=self.Loader)
+
+    def load_all(self, text):
+        import yaml
+
+        return yaml.load_all(text, Loader=self.Loader)
+
+    def dump_all(self, documents, stream, aliases=True):
+        import yaml
+
+        # NOTE written to a string first, so that nothing is written if
+        # ruamel has to take over.
+        text = None
+        if all(isinstance(document, (dict, list)) for document in documents):
+            try:
+                text = yaml.dump_all(
+                    documents,
+                    Dumper=self.Dumper if aliases else self.NoAliasDumper,
+                    default_flow_style=False,
+                    allow_unicode=True,
+                )
+            except _RuamelOnly:
+                pass
+        if text is None or _LONG_LINE.search(text):
+            if self._ruamel is None:
+                self._ruamel = RuamelBackend()
+            self._ruamel.dump_all(documents, stream, aliases=aliases)
+        else:
+            stream.write(text)
+
+    @staticmethod
+    def available():
+        try:
+            import yaml
+        except ImportError:
+            return False
+        return getattr(yaml, "__with_libyaml__", False)
+
+
+def _libyaml_classes():
+    import yaml
+    from yaml.constructor import ConstructorError
+    from yaml.emitter import Emitter
+
+    class Resolver(yaml.resolver.BaseResolver):
+        yaml_implicit_resolvers = {}
+
+    for tag, regexp, first in YAML_1_2_RESOLVERS:
+        Resolver.add_implicit_resolver(tag, re.compile(regexp, re.X), list(first))
+
+    class Loader(yaml.CSafeLoader):
+        yaml_implicit_resolvers = Resolver.yaml_implicit_resolvers
+
+        def construct_yaml_int(self, node):
+            # YAML 1.2: no 0 prefixed octals or sexagesimals, 0o is octal
+            value = self.construct_scalar(node).replace("_", "")
+            sign = -1 if value[0] == "-" else 1
+            value = value.lstrip("+-")
+            for prefix, base in (("0b", 2), ("0x", 16), ("0o", 8)):
+                if value.startswith(prefix):
+                    return sign * int(value[2:], base)
+            return sign * int(value)
+
+        def construct_mapping(self, node, deep=False):
+            # ruamel refuses duplicate keys, PyYAML keeps the last one.
+            if isinstance(node, yaml.MappingNode):
+                seen = set()
+                for key_node, _ in node.value:
+                    if key_node.tag == "tag:yaml.org,2002:merge":
+                        continue
+                    if not isinstance(key_node, yaml.ScalarNode):
+                        continue
+                    key = (key_node.tag, key_node.value)
+                    if key in seen:
+                        raise ConstructorError(
+                            "while constructing a mapping",
+                            node.start_mark,
+                            "found duplicate key %r" % key_node.value,
+                            key_node.start_mark,
+                        )
+                    seen.add(key)
+            return super().construct_mapping(node, deep=deep)
+
+    Loader.add_constructor("tag:yaml.org,2002:int", Loader.construct_yaml_int)
+
+    class Dumper(yaml.CSafeDumper):
+        yaml_implicit_resolvers = Resolver.yaml_implicit_resolvers
+
+        def __init__(self, stream, **kwargs):
+            super().__init__(stream, **kwargs)
+            self.analyzer = Emitter(None, allow_unicode=True)
+
+        def represent_float(self, data):
+            # ruamel writes repr(1e17) as is, PyYAML turns it into 1.0e+17
+            if data != data or data in (self.inf_value, -self.inf_value):
+                return super().represent_float(data)
+            return self.represent_scalar("tag:yaml.org,2002:float", repr(data).lower())
+
+        def represent_str(self, data):
+            if "\r" in data or not data.isascii() and _RUAMEL_ONLY.search(data):
+                raise _RuamelOnly(data)
+            # ruamel double quotes, instead of single quoting, strings
+            # with line breaks or quotes in them.
+            if "\n" in data or (
+                "'" in data and not self.analyzer.analyze_scalar(data).allow_block_plain
+            ):
+                return self.represent_scalar("tag:yaml.org,2002:str", data, style='"')
+            return super().represent_str(data)
+
+    Dumper.add_representer(float, Dumper.represent_float)
+    Dumper.add_representer(str, Dumper.represent_str)
+
+    class NoAliasDumper(Dumper):
+        def ignore_aliases(self, data):
+            return True
+
+    return Loader, Dumper, NoAliasDumper
+
+
+BACKENDS = {
+    "libyaml": LibYAMLBackend,
+    "ruamel": RuamelBackend,
+}
+
+_BACKEND = None
+
+
+def backend():
+    """The yaml backend to use, see the module documentation for how
+    it's chosen."""
+    global _BACKEND
+    if _BACKEND is None:
+        _BACKEND = make_backend(os.environ.get(BACKEND_ENV))
+    return _BACKEND
+
+
+def make_backend(name=None):
+    """Returns a new backend named ``name`` or, if ``name`` is None, the
+    fastest one available."""
+    if name:
+        if name not in BACKENDS:
+            raise ValueError(
+                "Unknown yaml backend %s, expected one of %s."
+                % (name, ", ".join(sorted(BACKENDS)))
+            )
+        return BACKENDS[name]()
+    if LibYAMLBackend.available():
+        return LibYAMLBackend()
+    return RuamelBackend()
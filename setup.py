@@ -28,6 +28,9 @@ REQUIRED = [
 
 # What packages are optional?
 EXTRAS = {
+    'libyaml': ['PyYAML>=5.1'],
+    'orjson': ['orjson>=3'],
+    'validate': ['jsonschema>=3'],
 }
 
 here = os.path.dirname(__file__)
@@ -85,7 +88,7 @@ setup(
     author_email=EMAIL,
     python_requires=REQUIRES_PYTHON,
     url=URL,
-    packages=find_packages(exclude=('tests',)),
+    packages=find_packages(exclude=('tests', 'benchmarks')),
     scripts=['bin/p10s'],
     # If your package is a single module, use this instead of 'packages':
     # py_modules=['mypackage'],
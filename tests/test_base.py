@@ -1,6 +1,8 @@
+import os
+
 import pytest
 
-from p10s.base import BaseContext
+from p10s.base import BaseContext, write_output
 from pathlib import Path
 
 
@@ -36,3 +38,60 @@ class DummyContext2(BaseContext):
 def test_base_context_missing_output():
     with pytest.raises(Exception):
         DummyContext2(input='foo')
+
+
+class TextContext(BaseContext):
+    output_file_extension = '.txt'
+
+    def __init__(self, text, **kwargs):
+        super().__init__(**kwargs)
+        self.text = text
+
+    def render_to_stream(self, stream):
+        stream.write(self.text)
+
+
+def test_render_writes(tmp_dir):
+    output = tmp_dir / 'sub' / 'out.txt'
+    assert [(output, True)] == TextContext("foo", output=output).render()
+    assert "foo" == output.read_text()
+    assert [output] == list(output.parent.iterdir())
+
+
+def test_render_unchanged(tmp_dir):
+    output = tmp_dir / 'out.txt'
+    TextContext("foo", output=output).render()
+    os.utime(str(output), (0, 0))
+    assert [(output, False)] == TextContext("foo", output=output).render()
+    assert 0 == output.stat().st_mtime
+    assert [output] == list(tmp_dir.iterdir())
+
+
+@pytest.mark.parametrize('text', ["bar", "fooo", ""])
+def test_render_changed(tmp_dir, text):
+    output = tmp_dir / 'out.txt'
+    TextContext("foo", output=output).render()
+    output.chmod(0o600)
+    assert [(output, True)] == TextContext(text, output=output).render()
+    assert text == output.read_text()
+    assert 0o600 == output.stat().st_mode & 0o777
+
+
+def test_render_error(tmp_dir):
+    output = tmp_dir / 'out.txt'
+    TextContext("foo", output=output).render()
+    with pytest.raises(TypeError):
+        TextContext(None, output=output).render()
+    assert "foo" == output.read_text()
+    assert [output] == list(tmp_dir.iterdir())
+
+
+def test_write_output(tmp_dir):
+    output = tmp_dir / 'sub' / 'out.txt'
+    assert write_output(output, "foo")
+    mtime = output.stat().st_mtime_ns
+    assert not write_output(output, "foo")
+    assert mtime == output.stat().st_mtime_ns
+    assert write_output(output, "fo")
+    assert "fo" == output.read_text()
+    assert [output] == list(output.parent.iterdir())
@@ -0,0 +1,22 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+
+@pytest.mark.slow
+def test_benchmarks_run(tmp_dir):
+    output = tmp_dir / 'results.json'
+    subprocess.run(
+        [sys.executable, '-m', 'benchmarks', 'run', '--quick', '-r', '1',
+         '-k', 'merge_dicts', '-k', 'generate', '-o', str(output)],
+        cwd=str(Path(__file__).parent.parent),
+        check=True,
+    )
+    results = json.loads(output.read_text())['benchmarks']
+    assert sorted(results) == ['generate[10]', 'generate_cached[100]', 'merge_dicts[100]']
+    for result in results.values():
+        assert len(result['wall']) == 1
+        assert result['peak_rss'] > 0
@@ -0,0 +1,91 @@
+import json
+
+from p10s.cache import BuildCache
+from p10s.generator import Generator, P10SScript
+
+SCRIPT = """# -*- python -*-
+from pathlib import Path
+from p10s import tf, yaml
+from p10s.values import Values
+from lib import NAME
+
+VALUES = Values.from_files(Path.cwd())
+
+c = tf.Context()
+c += tf.Module(NAME, yaml(Path("module.yaml")))
+c += tf.variables(env=VALUES['env'])
+"""
+
+
+def _tree(tmp_dir):
+    (tmp_dir / 'pyterranetes').mkdir()
+    (tmp_dir / 'pyterranetes' / 'lib.py').write_text("NAME = 'm'\n")
+    (tmp_dir / 'values.yaml').write_text("env: qa\n")
+    (tmp_dir / 'sub').mkdir()
+    (tmp_dir / 'sub' / 'module.yaml').write_text("source: ./m\n")
+    script = tmp_dir / 'sub' / 'main.p10s'
+    script.write_text(SCRIPT)
+    return script
+
+
+def _generate(tmp_dir, capsys):
+    Generator().generate(tmp_dir, verbose=True, cache=True)
+    return capsys.readouterr().err
+
+
+def test_dependencies(tmp_dir):
+    script = P10SScript(_tree(tmp_dir)).compile()
+    assert {tmp_dir / 'pyterranetes' / 'lib.py',
+            tmp_dir / 'values.yaml',
+            tmp_dir / 'sub' / 'values.yaml',
+            tmp_dir / 'sub' / 'module.yaml'} <= script.dependencies
+
+
+def test_skip_unchanged(tmp_dir, capsys):
+    script = _tree(tmp_dir)
+    assert 'Compiling' in _generate(tmp_dir, capsys)
+    assert (tmp_dir / '.p10s-cache' / 'manifest.json').exists()
+    assert 'Skipping %s' % script in _generate(tmp_dir, capsys)
+
+
+def test_rebuild_on_change(tmp_dir, capsys):
+    script = _tree(tmp_dir)
+    output = script.with_suffix('.tf.json')
+    _generate(tmp_dir, capsys)
+
+    for changed, content in [(tmp_dir / 'values.yaml', "env: prd\n"),
+                             (tmp_dir / 'sub' / 'values.yaml', "env: stg\n"),
+                             (tmp_dir / 'sub' / 'module.yaml', "source: ./n\n"),
+                             (tmp_dir / 'pyterranetes' / 'lib.py', "NAME = 'n'\n")]:
+        changed.write_text(content)
+        assert 'Compiling' in _generate(tmp_dir, capsys)
+
+    assert {'module': {'n': {'source': './n'}},
+            'variable': {'env': {'default': 'stg'}}} == json.load(output.open())
+
+
+def test_rebuild_missing_output(tmp_dir, capsys):
+    script = _tree(tmp_dir)
+    _generate(tmp_dir, capsys)
+    script.with_suffix('.tf.json').unlink()
+    assert 'Compiling' in _generate(tmp_dir, capsys)
+    assert script.with_suffix('.tf.json').exists()
+
+
+def test_stale_version(tmp_dir, capsys):
+    script = _tree(tmp_dir)
+    _generate(tmp_dir, capsys)
+    manifest = tmp_dir / '.p10s-cache' / 'manifest.json'
+    data = json.load(manifest.open())
+    data['version'] = '0.0.0'
+    manifest.write_text(json.dumps(data))
+    assert not BuildCache(tmp_dir).is_fresh(script)
+
+
+def test_rebuild_on_settings_change(tmp_dir, capsys, monkeypatch):
+    script = _tree(tmp_dir)
+    _generate(tmp_dir, capsys)
+    monkeypatch.setenv('P10S_JSON_COMPACT', '1')
+    assert 'Compiling' in _generate(tmp_dir, capsys)
+    assert '\n' not in script.with_suffix('.tf.json').read_text()
+    assert 'Skipping %s' % script in _generate(tmp_dir, capsys)
@@ -58,6 +58,19 @@ def test_json(tmp_dir):
     assert json.load(out) == DATUM
 
 
+def test_json_compact(tmp_dir, monkeypatch):
+    c = cfg.JSONContext(tmp_dir / 'test', compact=True) + DATUM
+    c.render()
+    assert (tmp_dir / 'test.json').read_text() == json.dumps(DATUM, sort_keys=True, separators=(",", ":"))
+
+    monkeypatch.setenv('P10S_JSON_COMPACT', '1')
+    cfg.JSONContext(tmp_dir / 'env', data=DATUM).render()
+    assert (tmp_dir / 'env.json').read_text() == (tmp_dir / 'test.json').read_text()
+
+    cfg.JSONContext(tmp_dir / 'env', data=DATUM, compact=False).render()
+    assert (tmp_dir / 'env.json').read_text() == json.dumps(DATUM, indent=4, sort_keys=True)
+
+
 def test_yaml(tmp_dir):
     c = cfg.YAMLContext(tmp_dir / 'test') + DATUM
     c.render()
@@ -0,0 +1,87 @@
+import json
+import os
+import threading
+
+import pytest
+
+from p10s import daemon
+from p10s.__version__ import __version__
+
+
+@pytest.fixture
+def server(tmp_dir):
+    server = daemon.Daemon(socket_path=str(tmp_dir / 'p10s.sock'))
+    server.bind()
+    thread = threading.Thread(target=server.serve)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        thread.join()
+
+
+def test_generate(server, fixtures_dir):
+    input = fixtures_dir / 'generator_data' / 'simple' / 'simple.p10s'
+    output = input.with_suffix('.tf.json')
+    if output.exists():
+        output.unlink()
+    daemon.generate([input], socket_path=server.socket_path)
+    assert output.exists()
+    assert {'resource': {'a': {'b': {'count': 1}, 'c': {'count': 2}}, 'b': {'b': {'count': 3}}}} == json.load(output.open())
+
+
+def test_generate_verbose(server, fixtures_dir, capsys):
+    input = fixtures_dir / 'generator_data' / 'simple' / 'simple.p10s'
+    daemon.generate([input], verbose=True, socket_path=server.socket_path)
+    assert capsys.readouterr().err.startswith("Compiling %s\n" % input)
+
+
+def test_generate_error(server, fixtures_dir):
+    input = fixtures_dir / 'generator_data' / 'parallel_error' / 'bad.p10s'
+    with pytest.raises(daemon.DaemonError) as e:
+        daemon.generate([input], socket_path=server.socket_path)
+    assert 'ValueError: bad script' in str(e.value)
+
+
+def test_environ(server, tmp_dir, monkeypatch):
+    script = tmp_dir / 'env.p10s'
+    script.write_text("""
+import os
+from p10s import tf
+c = tf.Context()
+c += tf.variables(env=os.environ['P10S_TEST_ENV'])
+""")
+    monkeypatch.setenv('P10S_TEST_ENV', 'from-client')
+    daemon.generate([script], socket_path=server.socket_path)
+    assert {'variable': {'env': {'default': 'from-client'}}} == json.load(script.with_suffix('.tf.json').open())
+
+
+def test_version_mismatch(tmp_dir):
+    response = daemon.Daemon(socket_path=str(tmp_dir / 'p10s.sock')).handle({'version': '0.0.0'})
+    assert not response['ok']
+    assert __version__ == response['version']
+
+
+def test_no_daemon(tmp_dir, fixtures_dir):
+    with pytest.raises(daemon.DaemonUnavailable):
+        daemon.generate([fixtures_dir], socket_path=str(tmp_dir / 'missing.sock'))
+
+
+def test_already_running(server):
+    with pytest.raises(Exception):
+        daemon.Daemon(socket_path=server.socket_path).bind()
+
+
+def test_script_exits(server, tmp_dir, fixtures_dir):
+    script = tmp_dir / 'exit.p10s'
+    script.write_text("import sys\nsys.exit(3)\n")
+    with pytest.raises(daemon.DaemonError) as e:
+        daemon.generate([script], socket_path=server.socket_path)
+    assert 'SystemExit: 3' in str(e.value)
+    input = fixtures_dir / 'generator_data' / 'simple' / 'simple.p10s'
+    daemon.generate([input], socket_path=server.socket_path)
+
+
+def test_socket_mode(server):
+    assert 0o600 == os.stat(server.socket_path).st_mode & 0o777
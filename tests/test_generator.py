@@ -1,7 +1,7 @@
 import pytest
 import json
 import os
-from p10s.generator import Generator, P10SScript, _global_state
+from p10s.generator import GenerateError, Generator, P10SScript, _global_state
 import sys
 from copy import deepcopy
 
@@ -181,3 +181,64 @@ def test_register_context(fixtures_dir):
 
     assert dc.exists()
     assert {'module': {'dynamic_c': {}}} == json.load(dc.open())
+
+
+def test_generate_parallel(fixtures_dir):
+    base = fixtures_dir / 'generator_data' / 'with_lib'
+    outputs = [base / 'top.tf.json', base / 'sub' / 'bottom.tf.json']
+    for output in outputs:
+        if output.exists():
+            output.unlink()
+    Generator().generate(base, jobs=2)
+    for output in outputs:
+        assert {'provider': {'whatever': {}}} == json.load(output.open())
+
+
+def test_generate_parallel_errors(fixtures_dir):
+    base = fixtures_dir / 'generator_data' / 'parallel_error'
+    with pytest.raises(GenerateError) as e:
+        Generator().generate(base, jobs=2)
+    assert [base / 'bad.p10s'] == [filename for filename, _ in e.value.failures]
+    assert 'ValueError: bad script' in str(e.value)
+    assert {'module': {'good': {}}} == json.load((base / 'good.tf.json').open())
+
+
+def test_dependencies_library_modules(fixtures_dir):
+    base = fixtures_dir / 'generator_data' / 'with_lib'
+    script = P10SScript(base / 'top.p10s').compile()
+    assert {base / 'pyterranetes' / 'infra.py'} == script.dependencies
+
+
+def test_dependencies_library_module_already_imported(fixtures_dir):
+    base = fixtures_dir / 'generator_data' / 'with_lib'
+    P10SScript(base / 'top.p10s').compile()
+    script = P10SScript(base / 'sub' / 'bottom.p10s').compile()
+    assert {base / 'pyterranetes' / 'infra.py'} == script.dependencies
+    assert 'infra' not in sys.modules
+
+
+def test_generate_summary(fixtures_dir):
+    base = fixtures_dir / 'generator_data' / 'register_context'
+    Generator().generate(base)
+    summary = Generator().generate(base)
+    assert (1, 0, 5) == (summary.scripts, summary.written, summary.unchanged)
+
+
+def test_library_kinds_are_forgotten(tmp_dir):
+    from p10s import k8s
+    (tmp_dir / 'pyterranetes').mkdir()
+    (tmp_dir / 'pyterranetes' / 'crds.py').write_text(
+        "from p10s import k8s\n"
+        "class Certificate(k8s.KubernetesObject):\n"
+        "    API_VERSION = 'cert-manager.io/v1'\n"
+        "    KIND = 'Certificate'\n")
+    (tmp_dir / 'a.p10s').write_text(
+        "from p10s import k8s\n"
+        "import crds\n"
+        "c = k8s.Context()\n"
+        "c += k8s.from_yaml('apiVersion: cert-manager.io/v1\\nkind: Certificate\\n')\n"
+        "assert type(c.data[0]) is crds.Certificate\n")
+    kinds = dict(k8s.KINDS)
+    Generator().generate(tmp_dir / 'a.p10s')
+    assert kinds == k8s.KINDS
+    assert k8s.object_class('cert-manager.io/v1', 'Certificate') is k8s.KubernetesObject
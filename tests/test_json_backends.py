@@ -0,0 +1,167 @@
+import dataclasses
+import datetime
+import enum
+import io
+import json
+import random
+import uuid
+
+import pytest
+
+from p10s import json_backends
+from p10s.json_backends import OrjsonBackend, make_backend
+
+needs_orjson = pytest.mark.skipif(not OrjsonBackend.available(),
+                                  reason="orjson not installed")
+
+TERRAFORM = {
+    'resource': {
+        'aws_instance': {
+            'web%d' % i: {
+                'ami': 'ami-123456',
+                'count': i,
+                'tags': {'Name': 'web %d' % i, 'Team': 'héllo ☃'},
+                'lifecycle': {'create_before_destroy': True, 'ignore_changes': []},
+            } for i in range(10)
+        },
+    },
+    'variable': {'region': {'default': 'eu-west-1'}},
+}
+
+
+class Color(enum.Enum):
+    RED = 'red'
+
+
+class Size(enum.IntEnum):
+    SMALL = 1
+
+
+class Mode(str, enum.Enum):
+    FAST = 'fast'
+
+
+@dataclasses.dataclass
+class Point:
+    x: int = 1
+
+
+class Tags(dict):
+    pass
+
+
+SCALARS = [
+    0, -1, 2**63 - 1, -2**63, 2**64, 10**30, 0.1, 3.0, -0.0, 1e15, 1e16, 1e-4, 1e-5,
+    2.5e-7, 1e22, 5e-324, 1.7976931348623157e308, float('inf'), float('nan'),
+    True, False, None, '', 'null', '1.50', ': 2.5', '1.2.3', 'é', '☃', '😀', '\x7f',
+    '\x00', '\n', '"', '\\', '/', ' ', '\uffff',
+]
+
+
+def _dump(backend, data, compact):
+    stream = io.StringIO()
+    make_backend(backend).dump(data, stream, compact=compact)
+    return stream.getvalue()
+
+
+def _data(rnd, depth=0):
+    choice = rnd.random()
+    if depth > 5 or choice < 0.3:
+        return rnd.choice(SCALARS)
+    if choice < 0.6:
+        return [_data(rnd, depth + 1) for _ in range(rnd.randint(0, 4))]
+    if choice < 0.65:
+        return tuple(_data(rnd, depth + 1) for _ in range(rnd.randint(0, 3)))
+    return {rnd.choice(['a', 'b', 'é', '😀', '']) + str(rnd.randint(0, 3)): _data(rnd, depth + 1)
+            for _ in range(rnd.randint(0, 4))}
+
+
+@needs_orjson
+@pytest.mark.parametrize('compact', [False, True])
+@pytest.mark.parametrize('data', [
+    TERRAFORM,
+    {'values': SCALARS},
+    {'floats': [s for s in SCALARS if isinstance(s, float) and s == s and abs(s) != float('inf')]},
+    {'one': 1.5},
+    {'b': 1, 'a': 2, 10: 'mixed keys are not sorted'},
+    {'date': datetime.date(2020, 1, 2)},
+    {'when': [datetime.datetime(2020, 1, 2, 3, 4, 5)], 'time': datetime.time(1, 2)},
+    {'id': uuid.UUID(int=1)},
+    {'nested': [{'id': (uuid.UUID(int=1),)}]},
+    {'color': Color.RED},
+    {'size': Size.SMALL, 'mode': Mode.FAST},
+    {'point': Point()},
+    {'tags': Tags(id=uuid.UUID(int=1))},
+    [[1, [2, [3]]], {'a': {'b': {'c': {}}}}],
+    {},
+    [],
+    'scalar',
+])
+def test_same_output(data, compact):
+    try:
+        expected = _dump('json', data, compact)
+    except TypeError:
+        with pytest.raises(TypeError):
+            _dump('orjson', data, compact)
+    else:
+        assert _dump('orjson', data, compact) == expected
+
+
+@needs_orjson
+@pytest.mark.parametrize('compact', [False, True])
+def test_same_output_random(compact):
+    rnd = random.Random(0)
+    for _ in range(300):
+        data = {'k': _data(rnd)}
+        assert _dump('orjson', data, compact) == _dump('json', data, compact)
+
+
+@needs_orjson
+def test_compact_written_by_orjson(mocker):
+    backend = make_backend('orjson')
+    writer = mocker.spy(json_backends.json_writer, 'dump')
+    backend.dump(TERRAFORM, io.StringIO(), compact=True)
+    assert writer.call_count == 0
+    backend.dump({'nan': float('nan')}, io.StringIO(), compact=True)
+    assert writer.call_count == 1
+
+
+@needs_orjson
+@pytest.mark.parametrize('text', [
+    json.dumps(TERRAFORM, indent=4),
+    '{"big": 123456789012345678901234567890, "small": -9223372036854775809}',
+    '[18446744073709551615, 9223372036854775807, 1.5, -0, -0.0, 1E5, 1e400]',
+    '[NaN, Infinity, -Infinity]',
+    '{"a": 1, "a": 2}',
+    '"\\ud800"',
+    '"\\u00e9 é"',
+    ' {"a" : [ ] } ',
+])
+def test_same_data(text):
+    loaded = make_backend('orjson').loads(text)
+    expected = make_backend('json').loads(text)
+    assert repr(loaded) == repr(expected)
+
+
+@pytest.mark.parametrize('backend', [
+    'json',
+    pytest.param('orjson', marks=needs_orjson),
+])
+@pytest.mark.parametrize('text', ['{"a": 1}x', '', '\ufeff{}', '{'])
+def test_invalid(backend, text):
+    with pytest.raises(json.JSONDecodeError):
+        make_backend(backend).loads(text)
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        make_backend('nope')
+
+
+def test_backend_from_environ(monkeypatch):
+    monkeypatch.setenv('P10S_JSON_BACKEND', 'json')
+    assert json_backends.backend().name == 'json'
+    assert json_backends.backend() is json_backends.backend()
+    monkeypatch.setenv('P10S_JSON_BACKEND', 'nope')
+    with pytest.raises(ValueError):
+        json_backends.backend()
@@ -0,0 +1,90 @@
+import io
+import json
+import random
+
+import pytest
+
+from p10s import json_writer
+
+
+def _data(rnd, depth=0):
+    choice = rnd.random()
+    if depth > 5 or choice < 0.3:
+        return rnd.choice([0, -2, 10**30, 0.1, 2.5, 1e300, float('inf'), float('nan'),
+                           True, False, None, '', 'x', 'é\n"\\', '</script>'])
+    if choice < 0.6:
+        return [_data(rnd, depth + 1) for _ in range(rnd.randint(0, 4))]
+    if choice < 0.7:
+        return tuple(_data(rnd, depth + 1) for _ in range(rnd.randint(0, 3)))
+    return {rnd.choice(['a', 'b', 'é', 'c"d', '']) + str(rnd.randint(0, 3)): _data(rnd, depth + 1)
+            for _ in range(rnd.randint(0, 4))}
+
+
+def _dump(data, compact):
+    stream = io.StringIO()
+    json_writer.dump(data, stream, compact=compact)
+    return stream.getvalue()
+
+
+def _expected(data, compact):
+    if compact:
+        return json.dumps(data, sort_keys=True, separators=(',', ':'))
+    return json.dumps(data, indent=4, sort_keys=True)
+
+
+@pytest.mark.parametrize('compact', [False, True])
+@pytest.mark.parametrize('chunk_size', [1, json_writer.CHUNK_SIZE])
+def test_same_as_json(compact, chunk_size, monkeypatch):
+    monkeypatch.setattr(json_writer, 'CHUNK_SIZE', chunk_size)
+    rnd = random.Random(0)
+    for _ in range(500):
+        data = _data(rnd)
+        assert _dump(data, compact) == _expected(data, compact)
+
+
+@pytest.mark.parametrize('compact', [False, True])
+@pytest.mark.parametrize('data', [
+    {1: 'int', 2.5: 'float'},
+    {True: 'bool'},
+    {None: 'null'},
+    'scalar',
+    {'a': {'b': {'c': {'d': [1, {'e': []}]}}}},
+])
+def test_keys_and_scalars(compact, data):
+    assert _dump(data, compact) == _expected(data, compact)
+
+
+@pytest.mark.parametrize('compact', [False, True])
+@pytest.mark.parametrize('data', [
+    {'a': object()},
+    {(1, 2): 'tuple key'},
+    {1: 'mixed', 'a': 'keys'},
+    {'a': {'b': {'c': {'d': object()}}}},
+])
+def test_errors(compact, data):
+    with pytest.raises(TypeError):
+        _dump(data, compact)
+
+
+def test_writes_in_chunks(monkeypatch):
+    monkeypatch.setattr(json_writer, 'CHUNK_SIZE', 100)
+    writes = []
+
+    class Stream:
+        def write(self, text):
+            writes.append(text)
+
+    data = {'k%d' % i: {'v': i} for i in range(1000)}
+    json_writer.dump(data, Stream())
+    assert len(writes) > 10
+    assert max(len(text) for text in writes) < 2000
+    assert ''.join(writes) == _expected(data, False)
+
+
+def test_compact_default(monkeypatch):
+    monkeypatch.delenv('P10S_JSON_COMPACT', raising=False)
+    assert not json_writer.compact_default()
+    monkeypatch.setenv('P10S_JSON_COMPACT', '0')
+    assert not json_writer.compact_default()
+    monkeypatch.setenv('P10S_JSON_COMPACT', '1')
+    assert json_writer.compact_default()
@@ -1,9 +1,10 @@
 from collections import OrderedDict
+import json
 import shutil
 
 import pytest
 
-from p10s import k8s, cfg
+from p10s import k8s, cfg, loads
 
 
 @pytest.mark.parametrize('klass,kind', [(k8s.Service, 'Service'),
@@ -131,3 +132,234 @@ def test_add_dict():
     c = k8s.Context()
     c += {'apiVersion': 'v1', 'containers': [{'name': 'bob'}]}
     assert c._render_data() == [{'apiVersion': 'v1', 'containers': [{'name': 'bob'}]}]
+
+
+def test_iter_from_yaml(tmp_dir):
+    path = tmp_dir / 'bundle.yaml'
+    path.write_text("---\n" + "".join(
+        "---\napiVersion: v1\nkind: ConfigMap\nmetadata:\n  name: c%d\n" % i for i in range(5000)
+    ) + "---\n")
+    with path.open() as stream:
+        objects = k8s.iter_from_yaml(stream)
+        first = next(objects)
+        assert first.metadata == {'name': 'c0'}
+        # only as much of the file as the parser buffers has been read
+        assert stream.tell() < path.stat().st_size
+        assert len(list(objects)) == 4999
+
+
+def test_many_from_yaml_skips_empty_documents():
+    data = k8s.many_from_yaml("---\n---\nkind: Service\n---\n")
+    assert len(data) == 1
+    assert isinstance(data[0], k8s.Service)
+
+
+@pytest.mark.parametrize('klass', [k8s.Deployment, k8s.ConfigMap, k8s.Service, k8s.Job,
+                                   k8s.StatefulSet, k8s.Ingress, k8s.Secret])
+def test_every_kind_from_yaml(klass):
+    o = k8s.from_yaml("apiVersion: v1\nkind: %s\n" % klass.KIND)
+    assert type(o) is klass
+    assert o.data == {'apiVersion': 'v1', 'kind': klass.KIND}
+
+
+def test_unknown_kind_from_yaml():
+    data = k8s.many_from_yaml("""
+---
+apiVersion: v1
+kind: ServiceAccount
+---
+kind: Secret
+""")
+    assert type(data[0]) is k8s.KubernetesObject
+    assert data[0].data == {'apiVersion': 'v1', 'kind': 'ServiceAccount'}
+    assert type(data[1]) is k8s.Secret
+
+
+def test_missing_kind_from_yaml():
+    with pytest.raises(Exception):
+        k8s.from_yaml("apiVersion: v1\n")
+
+
+@pytest.fixture
+def kinds(monkeypatch):
+    monkeypatch.setattr(k8s, 'KINDS', dict(k8s.KINDS))
+
+
+def test_custom_kind(kinds):
+    class Certificate(k8s.KubernetesObject):
+        API_VERSION = 'cert-manager.io/v1'
+        KIND = 'Certificate'
+
+    class OldCertificate(k8s.KubernetesObject):
+        API_VERSION = 'certmanager.k8s.io/v1alpha1'
+        KIND = 'Certificate'
+
+    class WebDeployment(k8s.Deployment):
+        pass
+
+    data = k8s.many_from_yaml("""
+---
+apiVersion: cert-manager.io/v1
+kind: Certificate
+---
+apiVersion: certmanager.k8s.io/v1alpha1
+kind: Certificate
+---
+apiVersion: example.com/v1
+kind: Certificate
+---
+apiVersion: apps/v1
+kind: Deployment
+""")
+    assert [type(o) for o in data] == [Certificate, OldCertificate, k8s.KubernetesObject, k8s.Deployment]
+    assert k8s.object_class('apps/v1', 'Deployment') is k8s.Deployment
+    assert Certificate().data == {'apiVersion': 'cert-manager.io/v1', 'kind': 'Certificate'}
+
+
+def _split_context(tmp_dir, names):
+    c = k8s.Context(output=tmp_dir / 'out', split=True)
+    c += [k8s.Deployment({'metadata': {'name': name, 'namespace': 'web'}}) for name in names]
+    c += k8s.KubernetesObject({'metadata': {'name': 'system:view'}}, kind='ClusterRole')
+    return c
+
+
+def test_render_split(tmp_dir):
+    rendered = _split_context(tmp_dir, ['a', 'b']).render()
+    out = tmp_dir / 'out'
+    names = ['web_deployment_a.yaml', 'web_deployment_b.yaml', 'clusterrole_system-view.yaml']
+    assert rendered == [(out / name, True) for name in names + ['kustomization.yaml']]
+    assert k8s.from_yaml(out / 'web_deployment_b.yaml').metadata == {'name': 'b', 'namespace': 'web'}
+    assert loads.yaml(out / 'kustomization.yaml') == {
+        'apiVersion': 'kustomize.config.k8s.io/v1beta1',
+        'kind': 'Kustomization',
+        'resources': names,
+    }
+
+    rendered = _split_context(tmp_dir, ['a', 'c']).render()
+    assert [changed for _, changed in rendered] == [False, True, False, True]
+    assert sorted(p.name for p in out.iterdir()) == sorted(
+        ['web_deployment_a.yaml', 'web_deployment_c.yaml', 'clusterrole_system-view.yaml', 'kustomization.yaml'])
+
+
+def test_render_split_file_names(tmp_dir):
+    c = k8s.Context(output=tmp_dir, split=True)
+    c += [k8s.Service({'metadata': {'name': 'a'}}), k8s.Service({'metadata': {'name': 'a'}}),
+          k8s.Data({'foo': 'bar'}), {'kind': 'Secret'}]
+    assert [path.name for path, _ in c.render()] == [
+        'service_a.yaml', 'service_a_1.yaml', 'object_2.yaml', 'secret_3.yaml', 'kustomization.yaml']
+
+
+def test_render_split_default_output(tmp_dir):
+    c = k8s.Context(input=tmp_dir / 'app.p10s', split=True)
+    assert c.output == tmp_dir / 'app'
+    assert (c + k8s.Service()).split
+
+
+def _objects():
+    return [k8s.Deployment({'metadata': {'name': 'web'}, 'apiVersion': 'apps/v1'}),
+            k8s.Service({'metadata': {'name': 'web'}, 'spec': {'ports': [{'port': 80}]}})]
+
+
+@pytest.mark.parametrize('args,format', [
+    ({'output': 'out.json'}, 'json'),
+    ({'output': 'out.jsonl'}, 'jsonl'),
+    ({'output': 'out.yaml'}, 'yaml'),
+    ({'output': 'out.json', 'format': 'yaml'}, 'yaml'),
+    ({}, 'yaml'),
+])
+def test_format(args, format):
+    assert k8s.Context(**args).format == format
+
+
+def test_format_default_output(tmp_dir):
+    assert k8s.Context(input=tmp_dir / 'app.p10s', format='jsonl').output == tmp_dir / 'app.jsonl'
+    with pytest.raises(ValueError):
+        k8s.Context(format='xml')
+
+
+def test_render_json(tmp_dir):
+    c = k8s.Context(output=tmp_dir / 'out.json')
+    c += _objects()
+    c.render()
+    data = loads.json(tmp_dir / 'out.json')
+    assert data == {'apiVersion': 'v1', 'kind': 'List', 'items': [o.data for o in _objects()]}
+    assert json.dumps(data, indent=4, sort_keys=True) == (tmp_dir / 'out.json').read_text()
+
+
+def test_render_jsonl(tmp_dir):
+    c = k8s.Context(output=tmp_dir / 'out.jsonl')
+    c += _objects()
+    c.render()
+    lines = (tmp_dir / 'out.jsonl').read_text().split('\n')
+    assert lines[-1] == ''
+    assert [json.loads(line) for line in lines[:-1]] == [o.data for o in _objects()]
+    assert lines[0] == json.dumps(_objects()[0].data, sort_keys=True, separators=(',', ':'))
+
+
+def test_render_split_json(tmp_dir):
+    c = k8s.Context(output=tmp_dir, split=True)
+    c += _objects()
+    c.render()
+    c.format = 'json'
+    assert [path.name for path, _ in c.render()] == ['deployment_web.json', 'service_web.json', 'kustomization.yaml']
+    assert loads.json(tmp_dir / 'service_web.json') == _objects()[1].data
+    assert sorted(p.name for p in tmp_dir.iterdir()) == [
+        'deployment_web.json', 'kustomization.yaml', 'service_web.json']
+
+
+def test_render_shared(mocker):
+    template = k8s.Data({'containers': [{'image': 'nginx'}], 'volumes': ({'name': 'v'},)})
+    deployments = [k8s.Deployment({'spec': {'template': template}, 'metadata': {'name': 'd%d' % i}})
+                   for i in range(3)]
+    containers = template.data['containers']
+    render = mocker.spy(template, 'render')
+    rendered = [d.render() for d in deployments]
+    assert rendered[0]['spec']['template'] == {'containers': [{'image': 'nginx'}], 'volumes': [{'name': 'v'}]}
+    assert rendered[0]['spec']['template'] is rendered[2]['spec']['template']
+    # the containers have no Data in them, nothing to copy
+    assert rendered[0]['spec']['template']['containers'] is containers
+    assert [d.render() for d in deployments] == rendered
+    assert render.call_count == 6
+
+    template.body['containers'][0]['image'] = 'httpd'
+    assert [d.render()['spec']['template']['containers'] for d in deployments] == [[{'image': 'httpd'}]] * 3
+
+
+def test_render_changed():
+    o = k8s.Data({'a': [k8s.Data(1)], 'b': {}})
+    items = o.data['a']
+    assert o.render() == {'a': [1], 'b': {}}
+    items.append(2)
+    assert o.render() == {'a': [1, 2], 'b': {}}
+    o.body['a'].append(3)
+    assert o.render() == {'a': [1, 2, 3], 'b': {}}
+    # b had no Data in it, it's rendered as is
+    o.data['b']['c'] = k8s.Data(4)
+    assert o.render()['b']['c'] is o.data['b']['c']
+    o.changed()
+    assert o.render() == {'a': [1, 2, 3], 'b': {'c': 4}}
+
+
+def test_render_memoized_across_reads(mocker):
+    template = k8s.Data({'containers': [{'image': 'nginx'}]})
+    d = k8s.Deployment({
+        'apiVersion': 'apps/v1', 'metadata': {'name': 'web'}, 'spec': {'template': template, 'replicas': 1}})
+    rendered = d.render()
+    render = mocker.spy(k8s, '_render')
+    assert (d.kind, d.apiVersion, d.metadata['name'], d.body['spec']['replicas']) == ('Deployment', 'apps/v1', 'web', 1)
+    assert d.render() is rendered
+    assert render.call_count == 0
+    d.spec['replicas'] = 2
+    assert d.render()['spec'] == {'template': {'containers': [{'image': 'nginx'}]}, 'replicas': 2}
+    d.metadata = {'name': 'api'}
+    assert d.render()['metadata'] == {'name': 'api'}
+
+
+def test_render_shared_yaml(tmp_dir):
+    template = k8s.Data({'containers': [{'image': 'nginx'}]})
+    c = k8s.Context(output=tmp_dir / 'out.yaml')
+    c += [k8s.Deployment({'spec': {'a': template, 'b': template}}) for _ in range(2)]
+    c.render()
+    text = (tmp_dir / 'out.yaml').read_text()
+    assert '&' not in text and '*' not in text
+    assert loads.yaml_all(tmp_dir / 'out.yaml') == [d.render() for d in c.data]
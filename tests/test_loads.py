@@ -1,7 +1,8 @@
 import pytest
 from pathlib import Path
 from p10s import yaml, json, hcl
-from p10s.loads import _data, load_file
+from p10s.dependencies import tracking
+from p10s.loads import _data, load_file, yaml_iter
 
 
 def test_read_yaml_string():
@@ -52,3 +53,9 @@ def test_load_file(fixtures_dir):
 def test_load_file_exception(fixtures_dir, invalid_filename):
     with pytest.raises(Exception):
         load_file(fixtures_dir / invalid_filename)
+
+
+def test_yaml_iter_path(fixtures_dir):
+    with tracking() as dependencies:
+        assert [{'foo': True}] == list(yaml_iter(fixtures_dir / 'sample.yaml'))
+    assert dependencies == {(fixtures_dir / 'sample.yaml').absolute()}
@@ -1,5 +1,7 @@
+import sys
+
 import pytest
-from p10s.utils import merge_dicts
+from p10s.utils import merge_dicts, merge_many
 
 
 @pytest.mark.parametrize("a,b,expected", [
@@ -23,3 +25,41 @@ def test_merge_many():
     c = merge_dicts(c, {'b': {'c': {'d': 'e'}}})
 
     assert {'a': 1, 'b': {'c': {'d': 'e'}}} == c
+
+
+def test_merge_none():
+    assert merge_dicts() == {}
+    assert merge_many([]) == {}
+    a = {'a': 1}
+    assert merge_dicts(a) is a
+
+
+def test_merge_left_to_right():
+    a = {'a': {'x': 1}}
+    assert merge_dicts(a, {'a': 1}, {'a': {'y': 2}}) == {'a': {'y': 2}}
+    assert merge_dicts({'a': 1}, {'a': {'y': 2}}, {'a': {'z': 3}}) == {'a': {'y': 2, 'z': 3}}
+
+
+def test_merge_many_iterable():
+    result = merge_many({'k%d' % i: {'n': i, str(i): i}} for i in range(3))
+    assert result == {'k0': {'n': 0, '0': 0}, 'k1': {'n': 1, '1': 1}, 'k2': {'n': 2, '2': 2}}
+
+
+def test_merge_many_arguments():
+    dicts = [{'shared': {'last': i, str(i): i}} for i in range(5000)]
+    result = merge_many(dicts)
+    assert result['shared']['last'] == 4999
+    assert len(result['shared']) == 5001
+
+
+def test_merge_deep():
+    def deep(leaf):
+        d = leaf
+        for _ in range(sys.getrecursionlimit() * 2):
+            d = {'d': d}
+        return d
+
+    result = merge_dicts(deep({'a': 1}), deep({'b': 2}))
+    while 'd' in result:
+        result = result['d']
+    assert result == {'a': 1, 'b': 2}
@@ -1,6 +1,7 @@
 import os
 import subprocess
 import re
+import json
 
 
 def test_p10s_in_subdir(fixtures_dir):
@@ -19,3 +20,54 @@ def test_p10s_verbose(fixtures_dir):
                           stdout=subprocess.PIPE,
                           stderr=subprocess.STDOUT)
     assert re.match("Compiling .*?/tests/fixtures/generator_data/p10s_relative_dir/simple.p10s\n  Rendering <p10s.terraform.Context> to out/simple.tf.json in .*?/tests/fixtures/generator_data/p10s_relative_dir\n", proc.stdout.decode("utf-8"))
+
+
+def test_p10s_deps(fixtures_dir):
+    base = fixtures_dir / 'generator_data' / 'with_lib'
+    proc = subprocess.run(["p10s", "deps", str(base / 'top.p10s')], check=True, stdout=subprocess.PIPE)
+    assert {str(base / 'top.p10s'): [str(base / 'pyterranetes' / 'infra.py')]} == json.loads(proc.stdout.decode("utf-8"))
+
+
+def test_p10s_compact(fixtures_dir):
+    base = fixtures_dir / 'generator_data' / 'p10s_relative_dir'
+    output = base / 'out' / 'simple.tf.json'
+    subprocess.run(["p10s", "g", "--compact", str(base)], check=True)
+    assert '\n' not in output.read_text()
+    subprocess.run(["p10s", "g", "--no-compact", str(base)], check=True)
+    assert json.dumps(json.loads(output.read_text()), indent=4, sort_keys=True) == output.read_text()
+
+
+def test_p10s_json_backend(fixtures_dir):
+    base = fixtures_dir / 'generator_data' / 'p10s_relative_dir'
+    output = base / 'out' / 'simple.tf.json'
+    outputs = []
+    for backend in ['json', 'orjson']:
+        subprocess.run(["p10s", "g", "--compact", "--json-backend", backend, str(base)], check=True)
+        outputs.append(output.read_text())
+    assert outputs[0] == outputs[1]
+    assert subprocess.run(["p10s", "g", "--json-backend", "nope", str(base)]).returncode != 0
+
+
+def test_p10s_validate(tmp_dir):
+    (tmp_dir / 'service-v1.json').write_text(json.dumps({'properties': {'spec': {'type': 'object'}}}))
+    (tmp_dir / 'svc.p10s').write_text("from p10s import k8s\n"
+                                      "c = k8s.Context()\n"
+                                      "c += k8s.Service({'apiVersion': 'v1', 'spec': []})\n")
+    proc = subprocess.run(["p10s", "validate", "--schemas", str(tmp_dir), str(tmp_dir)],
+                          stderr=subprocess.PIPE)
+    assert proc.returncode != 0
+    assert "svc.yaml #0: $.spec: [] is not of type 'object'" in proc.stderr.decode("utf-8")
+    (tmp_dir / 'ok.p10s').write_text("from p10s import k8s\n"
+                                     "c = k8s.Context()\n"
+                                     "c += k8s.Service({'apiVersion': 'v1', 'spec': {}})\n")
+    env = dict(os.environ, P10S_K8S_SCHEMAS=str(tmp_dir))
+    for jobs in ['1', '2']:
+        proc = subprocess.run(["p10s", "generate", "--validate", "-j", jobs, str(tmp_dir)],
+                              env=env, stderr=subprocess.PIPE)
+        assert proc.returncode != 0
+        stderr = proc.stderr.decode("utf-8")
+        assert "svc.yaml #0: $.spec: [] is not of type 'object'" in stderr
+        assert "Traceback" not in stderr
+        assert not (tmp_dir / 'svc.yaml').exists()
+    subprocess.run(["p10s", "generate", str(tmp_dir)], env=env, check=True)
+    assert (tmp_dir / 'svc.yaml').exists()
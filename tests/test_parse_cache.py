@@ -0,0 +1,79 @@
+import pytest
+
+from p10s import hcl, json, yaml
+from p10s import parse_cache
+from p10s.generator import Generator
+from p10s.parse_cache import ParseCache
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = ParseCache()
+    monkeypatch.setattr(parse_cache, 'CACHE', cache)
+    return cache
+
+
+def _parse(text):
+    return {'text': text, 'list': [1, 2]}
+
+
+def test_copy_on_read():
+    cache = ParseCache()
+    first = cache.parse('p', 'a', _parse)
+    first['list'].append(3)
+    second = cache.parse('p', 'a', _parse)
+    assert second == {'text': 'a', 'list': [1, 2]}
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_keyed_by_parser_and_text():
+    cache = ParseCache()
+    cache.parse('p', 'a', _parse)
+    cache.parse('q', 'a', _parse)
+    cache.parse('p', 'b', _parse)
+    assert (cache.hits, cache.misses) == (0, 3)
+
+
+def test_lru_eviction():
+    cache = ParseCache()
+    cache.parse('p', 'a', _parse)
+    cache.max_bytes = cache.size * 2
+    cache.parse('p', 'b', _parse)
+    cache.parse('p', 'a', _parse)
+    cache.parse('p', 'c', _parse)
+    assert cache.size <= cache.max_bytes
+    misses = cache.misses
+    cache.parse('p', 'a', _parse)
+    assert cache.misses == misses
+    cache.parse('p', 'b', _parse)
+    assert cache.misses == misses + 1
+
+
+def test_disk_cache(tmp_dir):
+    ParseCache(directory=tmp_dir).parse('p', 'a', _parse)
+
+    def fail(text):
+        raise AssertionError("parsed again")
+
+    other = ParseCache(directory=tmp_dir)
+    assert other.parse('p', 'a', fail) == {'text': 'a', 'list': [1, 2]}
+    assert other.hits == 1
+
+
+def test_loads(cache, fixtures_dir):
+    for _ in range(2):
+        assert {'foo': True} == yaml(fixtures_dir / 'sample.yaml')
+        assert {'foo': True} == json('{"foo": true}')
+        assert {'a': {'b': 1}} == hcl('a { b = 1 }')
+    assert (cache.hits, cache.misses) == (3, 3)
+
+
+def test_generate_writes_disk_cache(cache, tmp_dir):
+    (tmp_dir / 'main.p10s').write_text(
+        "from p10s import cfg, yaml\n"
+        "c = cfg.JSONContext()\n"
+        "c += yaml('a: 1')\n"
+    )
+    Generator().generate(tmp_dir, cache=True)
+    assert list((tmp_dir / '.p10s-cache' / 'parse').glob('*/yaml.*/*.pickle'))
+    assert cache.directory is None
@@ -0,0 +1,60 @@
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+P10S = str(Path(__file__).parent.parent / 'bin' / 'p10s')
+HEAVY = ('ruamel', 'yaml', 'hcl', 'watchdog', 'multiprocessing', 'concurrent')
+
+
+def _imported(args):
+    """Runs python with ``args`` and returns the top level packages it
+    imported, according to -X importtime."""
+    proc = subprocess.run([sys.executable, '-X', 'importtime'] + args,
+                          check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    modules = set()
+    for line in proc.stderr.decode('utf-8').splitlines():
+        if line.startswith('import time:') and '|' in line:
+            modules.add(line.rsplit('|', 1)[1].strip().split('.')[0])
+    return modules
+
+
+def test_version_imports():
+    imported = _imported([P10S, 'version'])
+    assert 'p10s' in imported
+    assert [] == [m for m in HEAVY if m in imported]
+
+
+def test_terraform_script_imports(fixtures_dir):
+    script = fixtures_dir / 'generator_data' / 'with_lib' / 'top.p10s'
+    imported = _imported(['-c', 'from pathlib import Path; from p10s.generator import P10SScript; '
+                                'P10SScript(Path(%r)).compile().render()' % str(script)])
+    assert [] == [m for m in HEAVY if m in imported]
+
+
+def test_lazy_exports():
+    from p10s import cfg, hcl, json, k8s, register_context, tf, values, yaml  # noqa: F401
+    import p10s
+    assert p10s.tf is tf
+    assert p10s.register_context is register_context
+    with pytest.raises(AttributeError):
+        p10s.does_not_exist
+
+
+def _best_of(n, args):
+    times = []
+    for i in range(n):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+@pytest.mark.slow
+def test_version_startup_time():
+    # p10s itself should add next to nothing on top of python and click
+    baseline = _best_of(5, ['-c', 'import click'])
+    p10s = _best_of(5, [P10S, 'version'])
+    assert p10s - baseline < 0.05, "p10s version took %.3fs, python + click %.3fs" % (p10s, baseline)
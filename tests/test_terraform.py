@@ -1,5 +1,6 @@
 import pytest
 import p10s.terraform as tf
+from p10s.utils import merge_dicts
 import shutil
 from copy import deepcopy
 
@@ -370,6 +371,79 @@ def test_duplicate_terraform():
         c += t2
 
 
+def test_duplicate_in_extend():
+    c = tf.Context(strict=True)
+    c.extend([tf.Resource("x", "x", dict(a=1)), tf.Resource("x", "y", dict(a=2))])
+    with pytest.raises(tf.DuplicateBlockError) as error:
+        c.extend(tf.Resource("x", name, {}) for name in ["z", "x"])
+    assert error.value.existing == {'a': 1}
+    assert error.value.new_block.name == 'x'
+    assert sorted(c.data['resource']['x']) == ['x', 'y', 'z']
+
+
+def test_extend_same_as_merge():
+    def blocks():
+        return [
+            tf.Resource("t", "t", dict(a=1)),
+            tf.Resource("t", "u", dict(a=2)),
+            tf.Resource("t", "t", dict(b={'c': 1})),
+            tf.Resource("t", "t", dict(b={'d': 2})),
+            tf.Data("t", "t", dict(a=1)),
+            tf.Variable("v", dict(default=1)),
+            tf.Variable("v", "not a dict"),
+            tf.Variable("w", dict(default=1)),
+            tf.Locals(dict(a=1)),
+            tf.Locals(dict(b=2)),
+            tf.TerraformBlock({'resource': {'t': {'x': {}, 'y': {}}}, 'module': {}}),
+            tf.Resource("t", "x", dict(a=3)),
+        ]
+
+    merged = {}
+    for b in blocks():
+        merge_dicts(merged, b.data)
+    assert tf.Context().extend(iter(blocks())).data == merged
+    assert (tf.Context() + blocks()).data == merged
+
+
+def test_get_block():
+    c = tf.Context()
+    c += tf.Resource("aws_instance", "web", dict(ami='a'))
+    c += tf.Module("vpc", dict(source='./vpc'))
+    c += tf.Locals(dict(a=1))
+
+    r = c.get_resource("aws_instance", "web")
+    assert (r.type, r.name, r.body) == ("aws_instance", "web", {'ami': 'a'})
+    r.body['ami'] = 'b'
+    assert c.data['resource']['aws_instance']['web'] == {'ami': 'b'}
+    assert c.get_block("module", "vpc").body == {'source': './vpc'}
+    assert c.get_block("locals").body == {'a': 1}
+    assert c.get_resource("aws_instance", "db") is None
+    assert c.get_block("output", "vpc") is None
+
+
+def test_find():
+    c = tf.Context()
+    c += [tf.Module("m%d" % i, dict(source='./m%d' % (i % 3))) for i in range(9)]
+    c += [tf.Resource("t%d" % (i % 2), "r%d" % i, dict(ami='a', tags=[i])) for i in range(6)]
+
+    assert [m.name for m in c.find("module", where={'source': './m1'})] == ['m1', 'm4', 'm7']
+    assert [r.name for r in c.find("resource", "t1")] == ['r1', 'r3', 'r5']
+    assert [r.name for r in c.find("resource", "t0", {'ami': 'a'})] == ['r0', 'r2', 'r4']
+    assert [r.name for r in c.find("resource", where={'tags': [3]})] == ['r3']
+    assert c.find("module", where={'other': 1}) == []
+    assert c.find("variable") == []
+
+    # later blocks are indexed as they're added
+    c += tf.Module("m9", dict(source='./m1'))
+    c.module.m4 = {'source': './m2'}
+    assert [m.name for m in c.find("module", where={'source': './m1'})] == ['m1', 'm7', 'm9']
+
+    c.data['module']['m0']['source'] = './m1'
+    assert len(c.find("module", where={'source': './m1'})) == 3
+    c.reindex()
+    assert len(c.find("module", where={'source': './m1'})) == 4
+
+
 def test_output1():
     o = tf.Output(name='foo')
     assert o.data == {'output': {'foo': {}}}
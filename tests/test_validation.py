@@ -0,0 +1,188 @@
+import json
+
+import pytest
+
+from p10s import k8s, validation
+from p10s.generator import GenerateError, Generator
+from p10s.validation import Schemas, ValidationError
+
+try:
+    import jsonschema  # noqa: F401
+except ImportError:
+    HAS_JSONSCHEMA = False
+else:
+    HAS_JSONSCHEMA = True
+
+needs_jsonschema = pytest.mark.skipif(not HAS_JSONSCHEMA, reason="jsonschema not installed")
+
+CONTAINER = {
+    'type': 'object',
+    'required': ['name'],
+    'additionalProperties': False,
+    'properties': {'name': {'type': 'string'}, 'image': {'type': 'string'}},
+}
+
+DEPLOYMENT = {
+    'type': 'object',
+    'additionalProperties': False,
+    'properties': {
+        'apiVersion': {'type': 'string', 'enum': ['apps/v1']},
+        'kind': {'type': 'string', 'enum': ['Deployment']},
+        'metadata': {'type': 'object'},
+        'spec': {
+            'type': 'object',
+            'required': ['template'],
+            'additionalProperties': False,
+            'properties': {
+                'replicas': {'type': 'integer'},
+                'template': {
+                    'type': 'object',
+                    'properties': {'spec': {
+                        'type': 'object',
+                        'properties': {'containers': {'type': 'array', 'items': CONTAINER}},
+                    }},
+                },
+            },
+        },
+    },
+}
+
+SERVICE = {
+    'type': 'object',
+    'properties': {'spec': {'type': 'object', 'properties': {'type': {'enum': ['ClusterIP', 'NodePort']}}}},
+}
+
+
+@pytest.fixture
+def schemas_dir(tmp_dir):
+    for version in ['v1.29.0-standalone-strict', 'v1.28.0-standalone']:
+        (tmp_dir / version).mkdir()
+        (tmp_dir / version / 'deployment-apps-v1.json').write_text(json.dumps(DEPLOYMENT))
+        (tmp_dir / version / 'service-v1.json').write_text(json.dumps(SERVICE))
+    return tmp_dir
+
+
+def _deployment(name='web', **spec):
+    return k8s.Deployment({
+        'apiVersion': 'apps/v1',
+        'metadata': {'name': name, 'namespace': 'prod'},
+        'spec': {'template': {'spec': {'containers': [{'name': 'nginx', 'image': 'nginx'}]}}, **spec},
+    })
+
+
+def test_path(tmp_dir):
+    schemas = Schemas(tmp_dir)
+    assert schemas.path('v1', 'Service') == tmp_dir / 'service-v1.json'
+    assert schemas.path('apps/v1', 'Deployment') == tmp_dir / 'deployment-apps-v1.json'
+    assert schemas.path('networking.k8s.io/v1', 'Ingress') == tmp_dir / 'ingress-networking-v1.json'
+
+
+def test_version(schemas_dir):
+    assert Schemas(schemas_dir, '1.29.0').root == schemas_dir / 'v1.29.0-standalone-strict'
+    assert Schemas(schemas_dir, 'v1.28.0').root == schemas_dir / 'v1.28.0-standalone'
+    with pytest.raises(ValueError):
+        Schemas(schemas_dir, '1.30.0')
+
+
+@pytest.mark.parametrize('path,expected', [
+    ([], '$'),
+    (['spec', 'containers', 0, 'name'], '$.spec.containers[0].name'),
+    (['metadata', 'labels', 'app.kubernetes.io/name'], '$.metadata.labels["app.kubernetes.io/name"]'),
+])
+def test_json_path(path, expected):
+    assert validation.json_path(path) == expected
+
+
+@needs_jsonschema
+def test_errors(schemas_dir):
+    schemas = Schemas(schemas_dir, '1.29.0')
+    assert schemas.errors(_deployment().render()) == []
+    o = _deployment(replicas='two', replica=2)
+    o.spec['template']['spec']['containers'].append({'image': 'nginx'})
+    assert schemas.errors(o.render()) == [
+        ('$.spec', "Additional properties are not allowed ('replica' was unexpected)"),
+        ('$.spec.replicas', "'two' is not of type 'integer'"),
+        ('$.spec.template.spec.containers[1]', "'name' is a required property"),
+    ]
+    assert schemas.errors({'kind': 'Service', 'apiVersion': 'v1', 'spec': {'type': 'Nope'}}) == [
+        ('$.spec.type', "'Nope' is not one of ['ClusterIP', 'NodePort']"),
+    ]
+
+
+@needs_jsonschema
+def test_errors_without_schema(schemas_dir):
+    schemas = Schemas(schemas_dir, '1.29.0')
+    assert schemas.errors({'apiVersion': 'cert-manager.io/v1', 'kind': 'Certificate', 'spec': 1}) == []
+    assert schemas.errors({'kind': 'Service'}) == [('$', "'apiVersion' is a required property")]
+    assert schemas.errors(['a']) == [('$', "['a'] is not an object")]
+
+
+@needs_jsonschema
+def test_validators_compiled_once(schemas_dir, mocker):
+    schemas = Schemas(schemas_dir, '1.29.0')
+    compile = mocker.spy(schemas, '_compile')
+    for i in range(10):
+        schemas.errors(_deployment('d%d' % i).render())
+        schemas.errors({'apiVersion': 'v1', 'kind': 'Service'})
+    assert compile.call_count == 2
+
+
+@needs_jsonschema
+def test_context_validate(schemas_dir, tmp_dir):
+    c = k8s.Context(output=tmp_dir / 'out.yaml')
+    c += [_deployment('a'), _deployment('b', replicas='two'), k8s.Service({'apiVersion': 'v1'})]
+    with pytest.raises(ValidationError) as e:
+        c.validate(Schemas(schemas_dir, '1.29.0'))
+    assert e.value.errors == [
+        ('%s #1 Deployment prod/b' % (tmp_dir / 'out.yaml'), '$.spec.replicas', "'two' is not of type 'integer'"),
+    ]
+    assert str(e.value) == '%s #1 Deployment prod/b: $.spec.replicas: \'two\' is not of type \'integer\'' % (
+        tmp_dir / 'out.yaml')
+
+
+@needs_jsonschema
+def test_render_validates(schemas_dir, tmp_dir, monkeypatch):
+    monkeypatch.setenv('P10S_K8S_SCHEMAS', str(schemas_dir))
+    monkeypatch.setenv('P10S_K8S_VERSION', '1.29.0')
+    output = tmp_dir / 'out.yaml'
+    c = k8s.Context(output=output)
+    c += _deployment(replicas='two')
+    c.render()
+    monkeypatch.setenv('P10S_VALIDATE', '1')
+    output.unlink()
+    with pytest.raises(ValidationError):
+        c.render()
+    assert not output.exists()
+
+
+def test_schemas_from_environ(schemas_dir, monkeypatch):
+    monkeypatch.delenv('P10S_K8S_SCHEMAS', raising=False)
+    with pytest.raises(ValueError):
+        validation.schemas()
+    monkeypatch.setenv('P10S_K8S_SCHEMAS', str(schemas_dir))
+    monkeypatch.setenv('P10S_K8S_VERSION', '1.28.0')
+    assert validation.schemas().root == schemas_dir / 'v1.28.0-standalone'
+    assert validation.schemas() is validation.schemas()
+
+
+@needs_jsonschema
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_generator_validate(schemas_dir, tmp_dir, monkeypatch, jobs):
+    monkeypatch.setenv('P10S_K8S_SCHEMAS', str(schemas_dir))
+    monkeypatch.setenv('P10S_K8S_VERSION', '1.29.0')
+    scripts = tmp_dir / 'scripts'
+    scripts.mkdir()
+    for name, replicas in [('good', 2), ('bad', '"two"')]:
+        (scripts / (name + '.p10s')).write_text(
+            "from p10s import k8s\n"
+            "c = k8s.Context()\n"
+            "c += k8s.Deployment({'apiVersion': 'apps/v1', 'spec': {'replicas': %s, 'template': {}}})\n"
+            % replicas)
+    with pytest.raises(GenerateError) as e:
+        Generator().validate(scripts, jobs=jobs)
+    [(filename, error)] = e.value.failures
+    assert filename == scripts / 'bad.p10s'
+    assert error == "%s #0: $.spec.replicas: 'two' is not of type 'integer'\n" % (scripts / 'bad.yaml')
+    assert not (scripts / 'bad.yaml').exists()
+    (scripts / 'bad.p10s').unlink()
+    assert Generator().validate(scripts, jobs=jobs) == 1
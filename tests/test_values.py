@@ -1,5 +1,6 @@
 import pytest
 import os
+import p10s.values
 from p10s.values import Values, values, value, set_value
 
 
@@ -32,6 +33,53 @@ def test_values(fixtures_dir):
     assert expected == v.values
 
 
+def test_values_from_file(fixtures_dir):
+    v = Values.from_files(fixtures_dir / 'values_data' / 'top' / 'bottom' / 'values.yaml')
+    assert v['shared'] == 'set at bottom'
+    assert v['top_only'] == 'set at top'
+
+
+def test_values_from_relative_dir(fixtures_dir):
+    start = os.getcwd()
+    os.chdir(str(fixtures_dir / 'values_data' / 'top' / 'bottom'))
+    try:
+        assert Values.from_files('.')['top_only'] == 'set at top'
+    finally:
+        os.chdir(start)
+
+
+def test_values_from_files_are_shared(tmp_dir, mocker):
+    load_file = mocker.spy(p10s.values, 'load_file')
+    (tmp_dir / 'values.yaml').write_text("env: qa\nshared: {a: 1}\n")
+    for name in ['a', 'b']:
+        (tmp_dir / name).mkdir()
+        (tmp_dir / name / 'values.yaml').write_text("name: %s\nshared: {b: 2}\n" % name)
+
+    a = Values.from_files(tmp_dir / 'a')
+    b = Values.from_files(tmp_dir / 'b')
+    again = Values.from_files(tmp_dir / 'a')
+    assert load_file.call_count == 3
+
+    a['shared']['a'] = 'changed'
+    assert b.values == {'env': 'qa', 'name': 'b', 'shared': {'a': 1, 'b': 2}}
+    assert again.values == {'env': 'qa', 'name': 'a', 'shared': {'a': 1, 'b': 2}}
+
+
+def test_values_from_files_changes(tmp_dir):
+    (tmp_dir / 'values.yaml').write_text("env: qa\n")
+    (tmp_dir / 'sub').mkdir()
+    assert Values.from_files(tmp_dir / 'sub').values == {'env': 'qa'}
+
+    (tmp_dir / 'sub' / 'values.yaml').write_text("name: sub\n")
+    assert Values.from_files(tmp_dir / 'sub').values == {'env': 'qa', 'name': 'sub'}
+
+    (tmp_dir / 'values.yaml').write_text("env: production\n")
+    assert Values.from_files(tmp_dir / 'sub').values == {'env': 'production', 'name': 'sub'}
+
+    (tmp_dir / 'values.yaml').unlink()
+    assert Values.from_files(tmp_dir / 'sub').values == {'name': 'sub'}
+
+
 def _inner():
     return value('foo')
 
@@ -129,3 +177,142 @@ def test_values_add2(mocker):
     assert {'val': 'A'} == a.values
     assert {'val': 'B'} == b.values
     assert {'val': 'B'} == c.values
+
+
+def test_value_nested_merge():
+    with values({'a': {'x': 1, 'y': {'z': 1}}}):
+        with values({'a': {'y': {'w': 2}}}):
+            assert value('a') == {'x': 1, 'y': {'z': 1, 'w': 2}}
+        assert value('a') == {'x': 1, 'y': {'z': 1}}
+
+
+def test_value_changes_stay_in_scope():
+    with values({'a': {'x': 1}, 'l': [1]}):
+        with values(b=2):
+            value('a')['x'] = 2
+            value('l').append(2)
+            set_value('c', 3)
+            assert value('a') == {'x': 2}
+        assert value('a') == {'x': 1}
+        assert value('l') == [1]
+        assert value('c') is None
+
+
+def test_values_copy_is_independent():
+    a = Values({'a': {'x': 1}, 'b': 1})
+    b = a.copy()
+    a['a']['x'] = 2
+    del b['b']
+    b['c'] = 3
+    assert a.values == {'a': {'x': 2}, 'b': 1}
+    assert b.values == {'a': {'x': 1}, 'c': 3}
+
+
+def test_values_layers_are_flattened():
+    v = Values({'a': 0})
+    for i in range(100):
+        v['a'] = i
+        v = v.copy()
+    assert v._depth <= 17
+    assert v['a'] == 99
+
+
+def test_values_same_as_deepcopy():
+    # the layered implementation behaves like one which deep copies
+    # and merges plain dicts.
+    import random
+    from copy import deepcopy
+    from p10s.utils import merge_dicts
+
+    rnd = random.Random(0)
+
+    def data(depth=0):
+        if depth > 2 or rnd.random() < 0.4:
+            return rnd.choice([1, 'x', None, [1, 2]])
+        return {rnd.choice('abc'): data(depth + 1) for _ in range(rnd.randint(0, 3))}
+
+    def scribble(given):
+        # what layered was given, or handed out, is no longer its once
+        # it's been copied.
+        for new in given:
+            if isinstance(new, dict):
+                new['junk'] = 1
+            elif isinstance(new, list):
+                new.append('junk')
+        given.clear()
+
+    for _ in range(200):
+        layered, plain = Values(), {}
+        stack = []
+        given = []
+        for _ in range(20):
+            op = rnd.random()
+            key = rnd.choice('abcd')
+            if op < 0.3:
+                stack.append((layered, plain))
+                layered, plain = layered.copy(), deepcopy(plain)
+                scribble(given)
+            elif op < 0.4 and stack:
+                layered, plain = stack.pop()
+            elif op < 0.6:
+                new = data()
+                layered += {key: new}
+                merge_dicts(plain, {key: deepcopy(new)})
+                given.append(new)
+            elif op < 0.7:
+                new = data()
+                layered[key], plain[key] = new, deepcopy(new)
+                given.append(new)
+            elif op < 0.8 and key in plain:
+                del layered[key]
+                del plain[key]
+            elif op < 0.9 and isinstance(plain.get(key), dict):
+                given.append(layered[key])
+                given[-1]['m'] = plain[key]['m'] = 1
+            assert (key in layered) == (key in plain)
+            assert layered.get_value(key) == plain.get(key)
+            assert sorted(layered) == sorted(plain)
+        assert layered.values == plain
+
+
+def test_values_copy_doesnt_share_callers_dict():
+    d = {'a': {'x': 1}}
+    v = Values(d)
+    c = v.copy()
+    d['a']['x'] = 2
+    d['b'] = 1
+    assert c.values == {'a': {'x': 1}}
+
+    own = v.values
+    c = v.copy()
+    own['a']['x'] = 3
+    assert c['a'] == {'x': 1}
+    assert v['a'] == {'x': 1}
+    assert v.values is not own
+
+
+def test_values_copy_doesnt_share_merged_dicts():
+    d = {'x': 1}
+    v = Values()
+    v += {'c': d}
+    c = v.copy()
+    d['q'] = 1
+    assert c['c'] == {'x': 1}
+    assert v['c'] == {'x': 1}
+
+    base = Values({'a': {'y': {'z': 1}}})
+    v = base.copy()
+    d = {'y': {'w': 1}}
+    v += {'a': d}
+    w = v.copy()
+    d['y']['w'] = 2
+    assert w['a'] == {'y': {'z': 1, 'w': 1}}
+
+    items = [1]
+    v['l'] = items
+    read = v['a']
+    w = v.copy()
+    items.append(2)
+    read['y'] = None
+    assert w['l'] == [1]
+    assert w['a'] == {'y': {'z': 1, 'w': 1}}
@@ -5,6 +5,9 @@ import pytest
 import time
 from contextlib import contextmanager
 
+from p10s.generator import Generator
+from p10s.watcher import DependencyIndex, PyterranetesEventHandler, RebuildQueue, parse_duration
+
 
 @pytest.fixture
 def simple_p10s(fixtures_dir):
@@ -122,3 +125,157 @@ def test_watcher_modify(tmp_dir, simple_p10s, pwd_p10s):
             }
         except LoopExhausted:
             pytest.fail("didn't build for modified file %s in %s" % (dst, tmp_dir))
+
+
+def test_handler_generates_in_process(tmp_dir, simple_p10s):
+    new = tmp_dir / 'simple.p10s'
+    new.write_bytes(simple_p10s.read_bytes())
+    handler = PyterranetesEventHandler(ignore_dotfiles=True)
+    ok, summary = handler._maybe_generate(str(new), "building")
+    assert ok
+    assert 1 == summary.written
+    assert json.loads(new.with_suffix('.tf.json').read_text()) == {
+        'resource': {'a': {'b': {'count': 1}, 'c': {'count': 2}}, 'b': {'b': {'count': 3}}}}
+
+
+def test_handler_error(tmp_dir):
+    bad = tmp_dir / 'bad.p10s'
+    bad.write_text("raise ValueError('bad')\n")
+    ok, error = PyterranetesEventHandler(ignore_dotfiles=True)._maybe_generate(str(bad), "building")
+    assert not ok
+    assert isinstance(error, ValueError)
+
+
+def test_handler_ignores(tmp_dir):
+    handler = PyterranetesEventHandler(ignore_dotfiles=True)
+    assert not handler._maybe_generate(str(tmp_dir / '.hidden.p10s'))
+    assert not handler._maybe_generate(str(tmp_dir / 'values.yaml'))
+
+
+@pytest.mark.parametrize("text,seconds", [("150ms", 0.15), ("2s", 2.0), ("0.5", 0.5), (" 10 ms ", 0.01)])
+def test_parse_duration(text, seconds):
+    assert seconds == parse_duration(text)
+
+
+def test_parse_duration_invalid():
+    with pytest.raises(ValueError):
+        parse_duration("soon")
+
+
+def test_queue_coalesces():
+    queue = RebuildQueue(debounce=0.1)
+    queue.put('a.p10s', 'first')
+    queue.put('b.p10s', 'b')
+    queue.put('a.p10s', 'second')
+    assert [] == queue.pop_ready()
+    assert 0 < queue.timeout(default=1) <= 0.1
+    time.sleep(0.15)
+    assert [('b.p10s', ('b',)), ('a.p10s', ('second',))] == queue.pop_ready()
+    assert 0 == len(queue)
+    assert 1 == queue.timeout(default=1)
+
+
+def test_queue_newer_event_resets_window():
+    queue = RebuildQueue(debounce=0.1)
+    queue.put('a.p10s', 'first')
+    time.sleep(0.06)
+    queue.put('a.p10s', 'second')
+    time.sleep(0.06)
+    assert [] == queue.pop_ready()
+    time.sleep(0.06)
+    assert [('a.p10s', ('second',))] == queue.pop_ready()
+
+
+def test_handler_queues(tmp_dir):
+    queue = RebuildQueue(debounce=10)
+    handler = PyterranetesEventHandler(ignore_dotfiles=True, queue=queue)
+    assert handler._schedule(str(tmp_dir / 'a.p10s'), 'a')
+    assert not handler._schedule(str(tmp_dir / 'a.tf.json'), 'a')
+    assert not handler._schedule(str(tmp_dir / '.a.p10s'), 'a')
+    assert 1 == len(queue)
+
+
+LIB_SCRIPT = """
+from p10s import tf
+from lib import NAME
+c = tf.Context()
+c += tf.Module(NAME)
+"""
+
+
+def _lib_tree(tmp_dir):
+    (tmp_dir / 'pyterranetes').mkdir()
+    (tmp_dir / 'pyterranetes' / 'lib.py').write_text("NAME = 'a'\n")
+    script = tmp_dir / 'main.p10s'
+    script.write_text(LIB_SCRIPT)
+    return script
+
+
+def test_handler_rebuilds_dependents(tmp_dir):
+    script = _lib_tree(tmp_dir)
+    lib = tmp_dir / 'pyterranetes' / 'lib.py'
+    handler = PyterranetesEventHandler(ignore_dotfiles=True)
+    handler._maybe_generate(str(script), "building")
+    assert [str(script)] == handler.index.scripts(lib)
+
+    lib.write_text("NAME = 'b'\n")
+    assert handler._schedule(str(lib), "modified")
+    assert {'module': {'b': {}}} == json.loads(script.with_suffix('.tf.json').read_text())
+
+    assert not handler._schedule(str(tmp_dir / 'unrelated.py'), "modified")
+
+
+def test_handler_queues_dependents(tmp_dir):
+    script = _lib_tree(tmp_dir)
+    queue = RebuildQueue(debounce=10)
+    handler = PyterranetesEventHandler(ignore_dotfiles=True, queue=queue)
+    handler.index.update(script, [tmp_dir / 'values.yaml'])
+    handler._schedule(str(tmp_dir / 'values.yaml'), "modified")
+    handler._schedule(str(script), "modified")
+    assert 1 == len(queue)
+
+
+def test_index_from_cache(tmp_dir):
+    script = _lib_tree(tmp_dir)
+    Generator().generate(tmp_dir, cache=True)
+    index = DependencyIndex.from_cache(tmp_dir)
+    assert [str(script)] == index.scripts(tmp_dir / 'pyterranetes' / 'lib.py')
+    assert [] == index.scripts(script)
+
+
+def test_index_update_replaces():
+    index = DependencyIndex()
+    index.update('/a.p10s', ['/x', '/y'])
+    index.update('/a.p10s', ['/y'])
+    assert [] == index.scripts('/x')
+    assert ['/a.p10s'] == index.scripts('/y')
+
+
+def test_index_from_scripts(tmp_dir):
+    script = _lib_tree(tmp_dir)
+    (tmp_dir / 'broken.p10s').write_text("raise Exception('broken')\n")
+    index = DependencyIndex.from_scripts(tmp_dir)
+    assert not (tmp_dir / '.p10s-cache').exists()
+    assert not script.with_suffix('.tf.json').exists()
+    assert [str(script)] == index.scripts(tmp_dir / 'pyterranetes' / 'lib.py')
+
+    handler = PyterranetesEventHandler(ignore_dotfiles=True, index=index)
+    (tmp_dir / 'pyterranetes' / 'lib.py').write_text("NAME = 'b'\n")
+    assert handler._schedule(str(tmp_dir / 'pyterranetes' / 'lib.py'), "modified")
+    assert {'module': {'b': {}}} == json.loads(script.with_suffix('.tf.json').read_text())
+
+
+def test_index_from_scripts_uses_cache(tmp_dir, mocker):
+    script = _lib_tree(tmp_dir)
+    Generator().generate(tmp_dir, cache=True)
+    other = tmp_dir / 'other.p10s'
+    other.write_text(LIB_SCRIPT)
+    dependencies = mocker.spy(Generator, 'dependencies')
+    index = DependencyIndex.from_scripts(tmp_dir)
+    assert [other] == [call.args[1] for call in dependencies.call_args_list]
+    assert [str(script), str(other)] == index.scripts(tmp_dir / 'pyterranetes' / 'lib.py')
+
+    dependencies.reset_mock()
+    (tmp_dir / 'pyterranetes' / 'lib.py').write_text("NAME = 'b'\n")
+    DependencyIndex.from_scripts(tmp_dir)
+    assert [script, other] == sorted(call.args[1] for call in dependencies.call_args_list)
@@ -0,0 +1,146 @@
+import datetime
+import io
+
+import pytest
+
+from p10s import yaml_backends
+from p10s.yaml_backends import LibYAMLBackend, make_backend
+
+needs_libyaml = pytest.mark.skipif(not LibYAMLBackend.available(),
+                                   reason="PyYAML with libyaml not installed")
+
+DEPLOYMENT = {
+    'apiVersion': 'apps/v1',
+    'kind': 'Deployment',
+    'metadata': {
+        'name': 'web',
+        'labels': {'app': 'web', 'tier': 'frontend'},
+        'annotations': {
+            'kubectl.kubernetes.io/last-applied-configuration': '{"a": 1}\n',
+            'description': "it's the web server, don't touch",
+        },
+    },
+    'spec': {
+        'replicas': 3,
+        'template': {
+            'spec': {
+                'containers': [{
+                    'name': 'web',
+                    'image': 'nginx:1.19',
+                    'args': ['--port', '8080', '--verbose'],
+                    'env': [{'name': 'DEBUG', 'value': 'yes'},
+                            {'name': 'MODE', 'value': '0644'},
+                            {'name': 'EMPTY', 'value': ''}],
+                    'resources': {'limits': {'cpu': 0.5, 'memory': '128Mi'}},
+                }],
+                'volumes': [],
+                'nodeSelector': {},
+            },
+        },
+    },
+}
+
+SCALARS = [
+    'yes', 'no', 'on', 'off', 'y', 'N', 'true', 'False', 'null', 'Null', '~', '',
+    '0777', '0o17', '0x1f', '0b11', '1:20', '1_000', '1e5', '.5', '.inf', '=', '<<',
+    '2001-12-14', '- a', 'a: b', '#c', 'c #d', "it's", "'quoted'", '"dq"',
+    'line\nbreak', 'trailing\n', ' lead', 'trail ', 'tab\tz', 'héllo ☃', '\x07', '😀', 'a 😀\nb',
+    '*a', '&a', '!t', '%p', '@x', '[a]', '{a}', '? x', 'a, b', 'long ' * 30,
+    0, -1, 12345678901234567890, 0.1, 1e17, -2.5e-07, float('inf'), 3.0,
+    True, False, None,
+]
+
+
+def _dump(backend, documents, **kwargs):
+    stream = io.StringIO()
+    make_backend(backend).dump_all(documents, stream, **kwargs)
+    return stream.getvalue()
+
+
+@needs_libyaml
+@pytest.mark.parametrize('documents', [
+    [DEPLOYMENT],
+    [DEPLOYMENT, {'kind': 'Service'}, []],
+    [{'values': SCALARS}],
+    [{str(scalar): 'x' for scalar in SCALARS if scalar != 'long ' * 30}],
+    [{'nested': [[1, [2, [3]]], {'a': {'b': {'c': {}}}}]}],
+    [{'b': 1, 'a': 2, 10: 'mixed keys are not sorted'}],
+    [{'description': 'This deployment runs the frontend web service for the public site and its many friends'}],
+    [{'a': 'x' * 100}],
+    [{'a': {'b': {'c': {'d': {'e': {'description': 'This deployment runs the frontend web service for the public site',
+                                    'f': ['x' * 70]}}}}}}],
+    [{'a': 'k' * 90, 'x' * 70: 'v' * 20}],
+    [{'a': 'next\x85line', 'b': 'line\u2028separator', 'c\rd': 'carriage\rreturn'}],
+    ['scalar'],
+    [],
+])
+def test_same_output(documents):
+    assert _dump('ruamel', documents) == _dump('libyaml', documents)
+
+
+@needs_libyaml
+@pytest.mark.parametrize('text', [
+    'a: yes\nb: 0777\nc: 0o17\nd: 1:20\ne: 1_000\nf: .inf\ng: ~\nh: 0x1F\ni: 1e3\n',
+    'base: &b {x: 1, y: 2}\nd:\n  <<: *b\n  y: 3\n',
+    '---\na: |\n  line\n  two\nb: >\n  folded\n---\n- [1, 2, {z: null}]\n',
+    'a: !!str 1\nb: !!binary aGVsbG8=\nc: 2001-12-14\nd: True\ne: NULL\n',
+])
+def test_same_data(text):
+    assert list(make_backend('ruamel').load_all(text)) == list(make_backend('libyaml').load_all(text))
+
+
+@needs_libyaml
+def test_round_trip():
+    documents = [DEPLOYMENT, {'values': SCALARS}]
+    assert list(make_backend('libyaml').load_all(_dump('libyaml', documents))) == documents
+
+
+@needs_libyaml
+@pytest.mark.parametrize('document', [{'emoji': '😀'}, {'long': 'x' * 80}, {'nel': '\x85'}])
+def test_written_by_ruamel(document):
+    backend = make_backend('libyaml')
+    stream = io.StringIO()
+    backend.dump_all([DEPLOYMENT], stream)
+    assert backend._ruamel is None
+    backend.dump_all([document], stream)
+    assert backend._ruamel is not None
+    assert stream.getvalue() == _dump('ruamel', [DEPLOYMENT]) + _dump('ruamel', [document])
+
+
+@needs_libyaml
+def test_yaml_1_2():
+    data = make_backend('libyaml').load('a: yes\nb: 0777\nc: 1:20\nd: 2001-12-14\n')
+    assert data == {'a': 'yes', 'b': 777, 'c': '1:20', 'd': datetime.date(2001, 12, 14)}
+
+
+@pytest.mark.parametrize('backend', [
+    'ruamel',
+    pytest.param('libyaml', marks=needs_libyaml),
+])
+def test_duplicate_keys(backend):
+    with pytest.raises(Exception):
+        make_backend(backend).load('a: 1\na: 2\n')
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        make_backend('nope')
+
+
+def test_backend_from_environ(monkeypatch):
+    monkeypatch.setattr(yaml_backends, '_BACKEND', None)
+    monkeypatch.setenv('P10S_YAML_BACKEND', 'ruamel')
+    assert yaml_backends.backend().name == 'ruamel'
+    assert yaml_backends.backend() is yaml_backends.backend()
+
+
+@pytest.mark.parametrize('backend', [
+    'ruamel',
+    pytest.param('libyaml', marks=needs_libyaml),
+])
+def test_aliases(backend):
+    shared = {'a': [1, 2]}
+    documents = [{'x': shared, 'y': shared}, {'z': shared}]
+    assert _dump(backend, documents) == 'x: &id001\n  a:\n  - 1\n  - 2\ny: *id001\n---\nz:\n  a:\n  - 1\n  - 2\n'
+    assert _dump(backend, documents, aliases=False) == \
+        'x:\n  a:\n  - 1\n  - 2\ny:\n  a:\n  - 1\n  - 2\n---\nz:\n  a:\n  - 1\n  - 2\n'